@@ -6,6 +6,8 @@ DOWNLOAD_PATH = os.path.join(os.path.abspath(os.path.join(os.getcwd(), os.pardir
 
 MOVIE_DATA_PATH = os.path.join(DOWNLOAD_PATH, "tmdb_5000_movies.csv")
 CREDITS_DATA_PATH = os.path.join(DOWNLOAD_PATH, "tmdb_5000_credits.csv")
+TITLE_INDEX_PATH = os.path.join(DOWNLOAD_PATH, "title_trigrams.pkl")
+TELEMETRY_DIR = os.path.join(DOWNLOAD_PATH, "telemetry")
 
 
 DB_CONFIG = {
@@ -14,4 +16,15 @@ DB_CONFIG = {
     "user": "annap",
     "password": "annap123",
     "database": "annap"
-}
\ No newline at end of file
+}
+
+# optional sharding layer (src/sharding.py): one entry per shard, e.g. local instances for testing
+SHARD_DB_CONFIGS = [
+    {"host": "127.0.0.1", "port": 3307, "user": "root", "password": "root", "database": "tmdb_shard_0"},
+    {"host": "127.0.0.1", "port": 3308, "user": "root", "password": "root", "database": "tmdb_shard_1"},
+]
+
+# optional read replicas of DB_CONFIG (src/replica_routing.py); query_* reads are spread across them
+REPLICA_DB_CONFIGS = [
+    {"host": "127.0.0.1", "port": 3309, "user": "annap", "password": "annap123", "database": "annap"},
+]
@@ -0,0 +1,157 @@
+""" Precomputed genre x year x language x company aggregates, with roll-up, drill-down and slicing. """
+
+from itertools import compress
+
+
+CUBE_TABLE = "Analytics_Cube"
+
+# dimension -> (cube column, SQL expression over the base tables, joins needed to compute it)
+DIMENSIONS = {
+    "genre": ("genre_name", "g.genre_name",
+              "JOIN Movies_Genres mg ON mg.movie_id = m.movie_id JOIN Genres g ON g.genre_id = mg.genre_id"),
+    "year": ("release_year", "YEAR(m.release_date)", ""),
+    "language": ("original_language", "m.original_language", ""),
+    "company": ("production_company_name", "pc.production_company_name",
+                "JOIN Movies_Production_Companies mpc ON mpc.movie_id = m.movie_id "
+                "JOIN Production_Companies pc ON pc.production_company_id = mpc.production_company_id"),
+}
+
+# grouping columns that identify a dimension value (company names are not unique, ids are)
+GROUP_KEYS = {"genre": "g.genre_id", "company": "pc.production_company_id"}
+
+
+def grouping_id(dimensions):
+    """
+    Bitmask of the dimensions a cuboid is grouped by (bit i = i-th entry of DIMENSIONS).
+    """
+    return sum(1 << i for i, name in enumerate(DIMENSIONS) if name in dimensions)
+
+
+def build_analytics_cube(cursor, connection):
+    """
+    Materializes every cuboid (all 16 subsets of the dimensions) into Analytics_Cube.
+
+    Each cuboid is aggregated from the base tables joining only the link tables of its own dimensions,
+    so a movie with several genres or companies is counted once per value of the grouped dimensions
+    and never in the cuboids that do not group by them. Measures are additive: movie count,
+    revenue and budget sums, and the vote sum (vote_average * vote_count) with its vote count.
+
+    :param cursor: Database cursor for executing queries.
+    :param connection: connection to database.
+    """
+    print("building analytics cube...")
+    try:
+        cursor.execute(f"DROP TABLE IF EXISTS {CUBE_TABLE};")
+        cursor.execute(f"""
+            CREATE TABLE {CUBE_TABLE} (
+                grouping_id TINYINT NOT NULL,
+                genre_name VARCHAR(128),
+                release_year SMALLINT,
+                original_language VARCHAR(10),
+                production_company_name VARCHAR(128),
+                movie_count INT,
+                revenue_sum BIGINT,
+                budget_sum BIGINT,
+                vote_sum DOUBLE,
+                vote_count BIGINT,
+                INDEX idx_cube_cell (grouping_id, genre_name, release_year, original_language)
+                );""")
+
+        names = list(DIMENSIONS)
+        for mask in range(1 << len(names)):
+            included = [bool(mask & (1 << i)) for i in range(len(names))]
+            dimensions = list(compress(names, included))
+
+            values = [DIMENSIONS[name][1] if name in dimensions else "NULL" for name in names]
+            joins = " ".join(DIMENSIONS[name][2] for name in dimensions)
+            group_by = [GROUP_KEYS.get(name, DIMENSIONS[name][1]) for name in dimensions]
+            group_by += [DIMENSIONS[name][1] for name in dimensions if name in GROUP_KEYS]
+
+            cursor.execute(f"""
+                INSERT INTO {CUBE_TABLE}
+                SELECT {mask}, {', '.join(values)},
+                       COUNT(*), SUM(m.revenue), SUM(m.budget),
+                       SUM(m.vote_average * m.vote_count), SUM(m.vote_count)
+                FROM Movies m
+                {joins}
+                {'GROUP BY ' + ', '.join(group_by) if group_by else ''};
+                """)
+        connection.commit()
+        print(f"* {CUBE_TABLE} was populated.")
+    except Exception as e:
+        connection.rollback()
+        print(f"Error building {CUBE_TABLE}: {e}")
+
+
+def cube_query(connection, group_by=(), filters=None):
+    """
+    Reads aggregates from the cube, grouped by some dimensions and sliced on others.
+    Only the precomputed cuboid of (group_by + sliced dimensions) is read; the base tables are not touched.
+
+    :param connection: connection to database.
+    :param group_by: dimensions to group by, e.g. ("genre", "year").
+    :param filters: dict of dimension -> single value to slice on, e.g. {"company": "Pixar"}
+                    (None selects the unknown value, e.g. movies without a release date).
+    :return: (results, column_names), ordered by the grouped dimensions.
+    """
+    filters = filters or {}
+    unknown = [name for name in list(group_by) + list(filters) if name not in DIMENSIONS]
+    if unknown:
+        print(f"Unknown cube dimensions: {', '.join(unknown)}")
+        return [], []
+
+    conditions, params = ["grouping_id = %s"], [grouping_id(set(group_by) | set(filters))]
+    for name, value in filters.items():
+        column = DIMENSIONS[name][0]
+        if value is None:
+            conditions.append(f"{column} IS NULL")
+        else:
+            conditions.append(f"{column} = %s")
+            params.append(value)
+
+    columns = [DIMENSIONS[name][0] for name in group_by]
+    # several cells can share a grouped value when company names repeat, so the cells are summed again
+    query = f"""
+            SELECT {''.join(column + ', ' for column in columns)}
+                   SUM(movie_count) AS movie_count,
+                   SUM(revenue_sum) AS revenue_sum,
+                   SUM(budget_sum) AS budget_sum,
+                   SUM(revenue_sum) - SUM(budget_sum) AS profit_sum,
+                   SUM(vote_sum) / NULLIF(SUM(vote_count), 0) AS avg_vote
+            FROM {CUBE_TABLE}
+            WHERE {' AND '.join(conditions)}
+            {'GROUP BY ' + ', '.join(columns) if columns else ''}
+            {'ORDER BY ' + ', '.join(columns) if columns else ''};
+            """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(query, tuple(params))
+        results = cursor.fetchall()
+        column_names = [desc[0] for desc in cursor.description]
+    except Exception as e:
+        print(f"Error executing cube_query: {e}")
+        return [], []
+    finally:
+        cursor.close()
+    return results, column_names
+
+
+def roll_up(connection, group_by, dimension, filters=None):
+    """
+    Aggregates one dimension away, e.g. (genre, year) -> (genre).
+    """
+    return cube_query(connection, [name for name in group_by if name != dimension], filters)
+
+
+def drill_down(connection, group_by, dimension, filters=None):
+    """
+    Splits the aggregates by one more dimension, e.g. (genre) -> (genre, year).
+    """
+    return cube_query(connection, list(group_by) + [dimension], filters)
+
+
+def slice_cube(connection, group_by, dimension, value, filters=None):
+    """
+    Restricts the aggregates to one value of a dimension, e.g. company = "Pixar".
+    """
+    return cube_query(connection, group_by, {**(filters or {}), dimension: value})
@@ -1,11 +1,18 @@
 # Handles data insertion.
 import json
+import time
+from contextlib import nullcontext
+
 import pandas as pd
 from tqdm import tqdm
 from config import config as cfg
+from src.approximate_queries import build_samples
+from src.title_index import build_title_index
+from src.analytics_cube import build_analytics_cube
+from src.load_telemetry import stage, timed, current_telemetry
 
 
-def load_data_to_database(cursor, connection):
+def load_data_to_database(cursor, connection, telemetry=None):
     """
     Loads and processes data into a database by reading datasets, transforming them into appropriate
     formats, and inserting the data into related database tables.
@@ -17,39 +24,78 @@ def load_data_to_database(cursor, connection):
 
     :param cursor: Database cursor object used to execute SQL commands.
     :param connection: Database connection object to commit changes or rollback in case of failures.
+    :param telemetry: optional LoadTelemetry; if given, the load's timings are recorded and exported as JSON.
     :return: None
     """
     print("loading database schema... (this might take a while :|)")
 
-    # load datasets
-    movies_data = pd.read_csv(cfg.MOVIE_DATA_PATH)
-    credits_data = pd.read_csv(cfg.CREDITS_DATA_PATH)
+    try:
+        with telemetry.activate() if telemetry else nullcontext():
+            # load datasets
+            with stage("read_csv", "movies"):
+                movies_data = pd.read_csv(cfg.MOVIE_DATA_PATH)
+            with stage("read_csv", "credits"):
+                credits_data = pd.read_csv(cfg.CREDITS_DATA_PATH)
+
+            tables = prepare_tables(cursor, movies_data, credits_data)
+            if telemetry:
+                tables = telemetry.timed_tables(tables)
+            for table_name, df in tables:
+                with stage("insert", table_name) as record:
+                    record["rows"] = insert_data(cursor, table_name, df, connection)
+
+            connection.commit()
+
+            # derived structures (approximate-query samples, title index, analytics cube) are rebuilt after every load
+            with stage("build_samples"):
+                build_samples(cursor, connection)
+            with stage("build_title_index"):
+                build_title_index(cursor)
+            with stage("build_analytics_cube"):
+                build_analytics_cube(cursor, connection)
+    finally:
+        # exported even when the load fails, since that is the run that needs diagnosing
+        if telemetry:
+            telemetry.print_summary()
+            telemetry.export_json()
+    print("All data loading completed!")
+
 
-    # Process and insert Movies data
+def prepare_tables(cursor, movies_data, credits_data):
+    """
+    Transforms the raw datasets into one DataFrame per database table.
+    Tables are yielded in foreign-key order, so each one can be inserted as soon as it is produced.
+
+    :param cursor: Database cursor object used to read the table columns.
+    :param movies_data: DataFrame read from tmdb_5000_movies.csv.
+    :param credits_data: DataFrame read from tmdb_5000_credits.csv.
+    :return: a generator of (table_name, DataFrame) tuples.
+    """
+    # Process Movies data
     movies_df = movies_data.copy()
     movies_df.rename(columns={'id': 'movie_id'}, inplace=True)  # dataset and sql-table first column name mismatch.
     movies_df = movies_df[get_table_columns(cursor, "Movies")]
-    insert_data(cursor, "Movies", movies_df, connection)
+    yield "Movies", movies_df
 
-    # Process and insert Genres data
+    # Process Genres data
     genre_df = process_json_column(movies_data, "genres")
     genre_df.columns = get_table_columns(cursor, "Genres")
     genre_df = genre_df.drop_duplicates(subset=['genre_id'])
-    insert_data(cursor, "Genres", genre_df, connection)
+    yield "Genres", genre_df
 
-    # Insert movie-genre relationships
-    insert_foreign_data(cursor, movies_data, 'id', 'genres', "Movies_Genres", connection)
+    # Movie-genre relationships
+    yield "Movies_Genres", build_foreign_data(cursor, movies_data, 'id', 'genres', "Movies_Genres")
 
-    # Process and insert Keywords data
+    # Process Keywords data
     keyword_df = process_json_column(movies_data, "keywords")
     keyword_df.columns = get_table_columns(cursor, "Keywords")
     keyword_df = keyword_df.drop_duplicates(subset=['keyword_id'])
-    insert_data(cursor, "Keywords", keyword_df, connection)
+    yield "Keywords", keyword_df
 
-    # Insert movie-keyword relationships
-    insert_foreign_data(cursor, movies_data, 'id', 'keywords', "Movies_Keywords", connection)
+    # Movie-keyword relationships
+    yield "Movies_Keywords", build_foreign_data(cursor, movies_data, 'id', 'keywords', "Movies_Keywords")
 
-    # Insert production-companies relationships
+    # Process production-companies data
     production_companies_df = process_json_column(movies_data, "production_companies")
 
     production_companies_df = production_companies_df.iloc[:,
@@ -57,28 +103,24 @@ def load_data_to_database(cursor, connection):
                                   range(2, len(production_companies_df.columns)))]  # swaps name <-> id columns
     production_companies_df.columns = get_table_columns(cursor, "Production_Companies")
     production_companies_df = production_companies_df.drop_duplicates(subset=['production_company_id'])
-    insert_data(cursor, "Production_Companies", production_companies_df, connection)
+    yield "Production_Companies", production_companies_df
 
-    # Insert movie-production-company relationships
-    insert_foreign_data(cursor=cursor,
-                        df=movies_data,
-                        column1='id',
-                        column2='production_companies',
-                        table_name="Movies_Production_Companies",
-                        connection=connection)
+    # Movie-production-company relationships
+    yield "Movies_Production_Companies", build_foreign_data(cursor=cursor,
+                                                            df=movies_data,
+                                                            column1='id',
+                                                            column2='production_companies',
+                                                            table_name="Movies_Production_Companies")
 
-    # Process and insert Actors data
+    # Process Actors data
     actors_df = process_json_column(credits_data, "cast")
     actors_df.rename(columns={'character': 'character_name', 'id': 'actor_id'}, inplace=True)
     actors_df = actors_df[get_table_columns(cursor, "Actors")]
     actors_df = actors_df.drop_duplicates(subset=['actor_id'])
-    insert_data(cursor, "Actors", actors_df, connection)
+    yield "Actors", actors_df
 
-    # Insert movie-actor relationships
-    insert_foreign_data(cursor, credits_data, 'movie_id', 'cast', "Movies_Actors", connection)
-
-    connection.commit()
-    print("All data loading completed!")
+    # Movie-actor relationships
+    yield "Movies_Actors", build_foreign_data(cursor, credits_data, 'movie_id', 'cast', "Movies_Actors")
 
 
 def insert_data_row_by_row(cursor, table_name, df, connection):
@@ -127,10 +169,11 @@ def insert_data(cursor, table_name, df, connection, batch_size=10000):
     :param table_name: Name of the table.
     :param df: DataFrame containing data to insert.
     :param batch_size: Number of rows per batch insert (default: 10,000).
+    :return: Number of rows inserted (0 if the table was already populated).
     """
     if table_exist(cursor=cursor, table_name=table_name):
         print(f"% {table_name} was already populated.")
-        return
+        return 0
 
     columns = get_table_columns(cursor, table_name)
 
@@ -146,19 +189,32 @@ def insert_data(cursor, table_name, df, connection, batch_size=10000):
     data_list = df.astype(object).values.tolist()
     total_rows = len(data_list)
 
+    inserted_rows = 0
+    telemetry = current_telemetry()
+    if telemetry:
+        telemetry.begin_table(cursor, table_name)
+
     # Insert in batches with tqdm progress tracking
     for i in tqdm(range(0, total_rows, batch_size), desc=f"Inserting into {table_name}", unit="batch"):
         batch = data_list[i : i + batch_size]  # Extract chunk
         try:
+            start = time.perf_counter()
             cursor.executemany(insert_row, batch)  # Execute batch insert
+            executed = time.perf_counter()
             connection.commit()  # Commit after successful batch insert
+            inserted_rows += len(batch)
+            if telemetry:
+                telemetry.record_batch(table_name, len(batch), executed - start, time.perf_counter() - executed)
         except Exception as e:
             connection.rollback()  # Rollback to prevent partial inserts
             print(f"\nError inserting batch {i // batch_size + 1} into {table_name}: {e}")
             # print(f"Query: {insert_row}")
             # print(f"Sample Row values: {batch[0] if batch else 'No data'}")  # Print first row of batch for debugging
 
+    if telemetry:
+        telemetry.end_table(cursor, table_name, inserted_rows)   # rolled-back batches are not counted
     print(f"* {table_name} was populated.")
+    return inserted_rows
 
 
 def insert_foreign_data(cursor, df, column1, column2, table_name, connection):
@@ -172,6 +228,22 @@ def insert_foreign_data(cursor, df, column1, column2, table_name, connection):
     :param column2: The JSON column containing foreign key references.
     :param table_name: Name of the table to insert relationships.
     """
+    pairs = build_foreign_data(cursor, df, column1, column2, table_name)
+    insert_data(cursor=cursor, table_name=table_name, df=pairs, connection=connection)
+
+
+@timed("build_foreign_data", "table_name")
+def build_foreign_data(cursor, df, column1, column2, table_name):
+    """
+    Builds the foreign key relationships of a JSON column as a DataFrame shaped like the relationship table.
+
+    :param cursor: Database cursor for executing queries.
+    :param df: DataFrame containing the foreign key data.
+    :param column1: The primary key column in the main table.
+    :param column2: The JSON column containing foreign key references.
+    :param table_name: Name of the relationship table.
+    :return: DataFrame of relationship rows.
+    """
     pairs = []
     for _, row in df.iterrows():
         id1 = row[column1]
@@ -186,9 +258,10 @@ def insert_foreign_data(cursor, df, column1, column2, table_name, connection):
     if table_name == "Movies_Actors":
         pairs['character_name'] = process_json_column(df, "cast")['character']
 
-    insert_data(cursor=cursor, table_name=table_name, df=pairs, connection=connection)
+    return pairs
 
 
+@timed("get_table_columns", "table_name")
 def get_table_columns(cursor, table_name):
     """
     Retrieves the column names of a given table.
@@ -201,6 +274,7 @@ def get_table_columns(cursor, table_name):
     return [_row[0] for _row in cursor.fetchall()]
 
 
+@timed("handle_missing_values")
 def handle_missing_values(data):
     """
     Handles missing values in the provided DataFrame.
@@ -223,6 +297,7 @@ def handle_missing_values(data):
     return data
 
 
+@timed("process_json_column", "column_name")
 def process_json_column(df, column_name):
     """
     Processes a column containing JSON data and converts it into a DataFrame.
@@ -241,6 +316,7 @@ def process_json_column(df, column_name):
     return new_df
 
 
+@timed("table_exist", "table_name")
 def table_exist(cursor, table_name):
     """
     Checks whether a given table exists.
@@ -0,0 +1,250 @@
+""" Approximate versions of the aggregate queries, answered from stratified samples built at load time. """
+
+import math
+from statistics import NormalDist
+
+
+SAMPLE_FRACTION = 0.1       # share of every stratum kept in the sample
+MIN_STRATUM_SAMPLE = 30     # strata smaller than this are kept whole, so their estimates are exact
+MIN_SAMPLE_SIZE = 30        # below this the normal approximation is unreliable -> exact fallback
+
+
+def build_samples(cursor, connection, fraction=SAMPLE_FRACTION, min_rows=MIN_STRATUM_SAMPLE, seed=42):
+    """
+    (Re)builds the stratified samples: a random share of the movies of every genre and of every
+    production company, together with the size of the stratum it was drawn from.
+
+    :param cursor: Database cursor for executing queries.
+    :param connection: connection to database.
+    :param fraction: share of every stratum to keep.
+    :param min_rows: minimum number of rows kept per stratum.
+    :param seed: seed of the random order, so rebuilding gives the same sample.
+    """
+    print("building stratified samples...")
+    strata = {
+        "Sample_Movies_Genres": ("Movies_Genres", "genre_id"),
+        "Sample_Movies_Companies": ("Movies_Production_Companies", "production_company_id"),
+    }
+    for sample_table, (link_table, stratum_column) in strata.items():
+        try:
+            cursor.execute(f"DROP TABLE IF EXISTS {sample_table};")
+            cursor.execute(f"""
+                CREATE TABLE {sample_table} (
+                    {stratum_column} INT,
+                    movie_id INT,
+                    stratum_size INT,
+                    PRIMARY KEY ({stratum_column}, movie_id)
+                    );""")
+            cursor.execute(f"""
+                INSERT INTO {sample_table} ({stratum_column}, movie_id, stratum_size)
+                SELECT {stratum_column}, movie_id, stratum_size
+                FROM (
+                    SELECT l.{stratum_column}, l.movie_id,
+                           ROW_NUMBER() OVER (PARTITION BY l.{stratum_column} ORDER BY RAND(%s)) AS rn,
+                           COUNT(*) OVER (PARTITION BY l.{stratum_column}) AS stratum_size
+                    FROM {link_table} l
+                    JOIN Movies m ON m.movie_id = l.movie_id
+                ) AS ranked
+                WHERE rn <= GREATEST(%s, CEIL(%s * stratum_size));
+                """, (seed, min_rows, fraction))
+            connection.commit()
+            print(f"* {sample_table} was populated.")
+        except Exception as e:
+            connection.rollback()
+            print(f"Error building {sample_table}: {e}")
+
+
+def mean_interval(mean, stddev, n, population, confidence):
+    """
+    Confidence interval half-width of a sample mean, with the finite population correction.
+
+    :param mean: sample mean.
+    :param stddev: sample standard deviation.
+    :param n: sample size.
+    :param population: stratum size.
+    :param confidence: confidence level, e.g. 0.95.
+    :return: the half-width of the interval.
+    """
+    if n >= population or population <= 1:
+        return 0.0   # the whole stratum was sampled
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    fpc = math.sqrt((population - n) / (population - 1))
+    return z * (stddev or 0.0) / math.sqrt(n) * fpc
+
+
+def _within_target(estimate, half_width, error):
+    return half_width == 0 or (estimate != 0 and half_width / abs(estimate) <= error)
+
+
+def _fetch(connection, query, params):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def approx_query_3(connection, genre, error=0.05, confidence=0.95):
+    """
+    Estimates the genre's average profit (the aggregate part of query_3) from the genre sample.
+    Falls back to the exact average when the sample is too small or the interval misses the error target.
+    """
+    query = """
+            SELECT COUNT(*), MAX(s.stratum_size), AVG(m.revenue - m.budget), STDDEV_SAMP(m.revenue - m.budget)
+            FROM Sample_Movies_Genres s
+            JOIN Genres g ON s.genre_id = g.genre_id
+            JOIN Movies m ON s.movie_id = m.movie_id
+            WHERE g.genre_name = %s;
+            """
+    exact_query = """
+            SELECT COUNT(*), COUNT(*), AVG(m.revenue - m.budget), 0
+            FROM Movies m
+            JOIN Movies_Genres mg ON m.movie_id = mg.movie_id
+            JOIN Genres g ON mg.genre_id = g.genre_id
+            WHERE g.genre_name = %s;
+            """
+    column_names = ["genre_name", "avg_profit", "ci_low", "ci_high", "sample_size", "exact"]
+    try:
+        n, population, mean, stddev = _fetch(connection, query, (genre,))[0]
+        exact = False
+        if n:
+            mean = float(mean)
+            half_width = mean_interval(mean, stddev, n, population, confidence)
+        if not n or (n < MIN_SAMPLE_SIZE and n < population) or not _within_target(mean, half_width, error):
+            n, population, mean, _ = _fetch(connection, exact_query, (genre,))[0]
+            if not n:
+                return [], []
+            mean, half_width, exact = float(mean), 0.0, True
+    except Exception as e:
+        print(f"Error executing approx_query_3: {e}")
+        return [], []
+    return [(genre, mean, mean - half_width, mean + half_width, n, exact)], column_names
+
+
+def approx_query_4(connection, genre, error=0.05, confidence=0.95, limit=10):
+    """
+    Estimates query_4 from the genre sample: the genre's average vote, and for every actor the number of
+    the genre's movies rated above it (scaled up from the sample, with a binomial confidence interval).
+    Falls back to the exact query_4 (with the same limit) when the sample is too small, or when the average
+    or any reported count misses the error target.
+    """
+    avg_query = """
+            SELECT COUNT(*), MAX(s.stratum_size), AVG(m.vote_average), STDDEV_SAMP(m.vote_average)
+            FROM Sample_Movies_Genres s
+            JOIN Genres g ON s.genre_id = g.genre_id
+            JOIN Movies m ON s.movie_id = m.movie_id
+            WHERE g.genre_name = %s;
+            """
+    count_query = """
+            SELECT a.actor_id, a.name, COUNT(m.movie_id) AS high_rated_movies
+            FROM Sample_Movies_Genres s
+            JOIN Genres g ON s.genre_id = g.genre_id
+            JOIN Movies m ON s.movie_id = m.movie_id
+            JOIN Movies_Actors ma ON ma.movie_id = m.movie_id
+            JOIN Actors a ON a.actor_id = ma.actor_id
+            WHERE g.genre_name = %s
+            AND m.vote_average > %s
+            GROUP BY a.actor_id, a.name
+            ORDER BY high_rated_movies DESC
+            LIMIT %s;
+            """
+    exact_query = """
+            WITH GenreAvg AS (
+                SELECT AVG(m.vote_average) AS avg_vote
+                FROM Movies m
+                JOIN Movies_Genres mg ON m.movie_id = mg.movie_id
+                JOIN Genres g ON mg.genre_id = g.genre_id
+                WHERE g.genre_name = %s
+            )
+            SELECT a.actor_id, a.name, COUNT(m.movie_id) AS high_rated_movies, GenreAvg.avg_vote
+            FROM Actors a
+            JOIN Movies_Actors ma ON a.actor_id = ma.actor_id
+            JOIN Movies m ON ma.movie_id = m.movie_id
+            JOIN Movies_Genres mg ON m.movie_id = mg.movie_id
+            JOIN Genres g ON mg.genre_id = g.genre_id
+            JOIN GenreAvg ON 1=1
+            WHERE g.genre_name = %s
+            AND m.vote_average > GenreAvg.avg_vote
+            GROUP BY a.actor_id, a.name, GenreAvg.avg_vote
+            ORDER BY high_rated_movies DESC
+            LIMIT %s;
+            """
+    column_names = ["actor_id", "name", "high_rated_movies", "ci_low", "ci_high", "genre_avg_vote", "exact"]
+    try:
+        n, population, mean, stddev = _fetch(connection, avg_query, (genre,))[0]
+        if n:
+            mean = float(mean)
+            half_width = mean_interval(mean, stddev, n, population, confidence)
+        results = []
+        if n and (n >= MIN_SAMPLE_SIZE or n >= population) and _within_target(mean, half_width, error):
+            scale = population / n
+            for actor_id, name, count in _fetch(connection, count_query, (genre, mean, limit)):
+                # the actor's share of sampled movies is a binomial proportion within the stratum
+                p = count / n
+                half = mean_interval(p, math.sqrt(p * (1 - p) * n / max(n - 1, 1)), n, population, confidence)
+                estimate = count * scale
+                results.append((actor_id, name, estimate, max(count, estimate - half * population),
+                                estimate + half * population, mean, False))
+
+        if not results or any(not _within_target(estimate, high - estimate, error)
+                              for _, _, estimate, _, high, _, _ in results):
+            results = _fetch(connection, exact_query, (genre, genre, limit))
+            return [(actor_id, name, count, count, count, float(avg_vote), True)
+                    for actor_id, name, count, avg_vote in results], column_names
+    except Exception as e:
+        print(f"Error executing approx_query_4: {e}")
+        return [], []
+    return results, column_names
+
+
+def approx_query_5(connection, error=0.05, confidence=0.95, min_movies=5, limit=5):
+    """
+    Estimates query_5 from the company sample: every company's total revenue is its movie count times
+    its sampled mean revenue. Movie counts are exact (the stratum sizes).
+    Falls back to the exact query_5 (with the same min_movies and limit) when a reported total misses the
+    error target.
+    """
+    query = """
+            SELECT pc.production_company_name, MAX(s.stratum_size) AS movie_count, COUNT(*) AS sample_size,
+                   AVG(m.revenue), STDDEV_SAMP(m.revenue)
+            FROM Sample_Movies_Companies s
+            JOIN Production_Companies pc ON s.production_company_id = pc.production_company_id
+            JOIN Movies m ON s.movie_id = m.movie_id
+            GROUP BY pc.production_company_id, pc.production_company_name
+            HAVING movie_count > %s;
+            """
+    exact_query = """
+            SELECT pc.production_company_name,
+                   COUNT(mpc.movie_id) AS movie_count,
+                   SUM(m.revenue) AS total_revenue,
+                   (SUM(m.revenue) / COUNT(mpc.movie_id)) AS avg_revenue_per_movie
+            FROM Production_Companies pc
+            JOIN Movies_Production_Companies mpc ON pc.production_company_id = mpc.production_company_id
+            JOIN Movies m ON m.movie_id = mpc.movie_id
+            GROUP BY pc.production_company_id, pc.production_company_name
+            HAVING COUNT(mpc.movie_id) > %s
+            ORDER BY total_revenue DESC, avg_revenue_per_movie DESC
+            LIMIT %s;
+            """
+    column_names = ["production_company_name", "movie_count", "total_revenue", "ci_low", "ci_high",
+                    "avg_revenue_per_movie", "exact"]
+    try:
+        estimates = []
+        for name, population, n, mean, stddev in _fetch(connection, query, (min_movies,)):
+            mean = float(mean or 0)
+            half = mean_interval(mean, stddev, n, population, confidence) * population
+            total = mean * population
+            estimates.append((name, population, total, total - half, total + half, mean, n))
+        estimates.sort(key=lambda row: (row[2], row[5]), reverse=True)
+        top = estimates[:limit]
+
+        if not top or any((n < MIN_SAMPLE_SIZE and n < population) or not _within_target(total, high - total, error)
+                          for _, population, total, _, high, _, n in top):
+            results = _fetch(connection, exact_query, (min_movies, limit))
+            return [(name, count, total, total, total, avg, True) for name, count, total, avg in results], \
+                column_names
+    except Exception as e:
+        print(f"Error executing approx_query_5: {e}")
+        return [], []
+    return [row[:6] + (False,) for row in top], column_names
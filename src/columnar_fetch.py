@@ -0,0 +1,125 @@
+""" Decodes result sets of raw cursors straight into typed column buffers. """
+
+import numpy as np
+import pandas as pd
+from mysql.connector.constants import FieldType
+
+
+INTEGER_TYPES = {FieldType.TINY, FieldType.SHORT, FieldType.INT24, FieldType.LONG, FieldType.LONGLONG,
+                 FieldType.YEAR}
+FLOAT_TYPES = {FieldType.FLOAT, FieldType.DOUBLE, FieldType.DECIMAL, FieldType.NEWDECIMAL}
+DATE_TYPES = {FieldType.DATE: "datetime64[D]", FieldType.DATETIME: "datetime64[us]",
+              FieldType.TIMESTAMP: "datetime64[us]"}
+
+
+CHUNK_ROWS = 10000     # rows fetched from the server per fetchmany() call and decoded together
+
+
+def _null_mask(values):
+    return np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+
+
+def decode_chunk(values, type_code):
+    """
+    Decodes a chunk of one column of raw (bytes) values using its MySQL type.
+
+    :param values: sequence of bytes/bytearray values (None for NULL).
+    :param type_code: MySQL field type from cursor.description.
+    :return: (values array, NULL mask or None if the chunk has no NULLs).
+    """
+    mask = _null_mask(values) if None in values else None
+    if type_code in INTEGER_TYPES or type_code in FLOAT_TYPES:
+        present = values if mask is None else [b"0" if v is None else v for v in values]
+        # the textual protocol sends numbers as ASCII without spaces, so one join + split tokenizes the chunk
+        tokens = np.array(b" ".join(present).split(), dtype="S")
+        return tokens.astype(np.float64 if type_code in FLOAT_TYPES else np.int64), mask
+
+    if type_code in DATE_TYPES:
+        present = values if mask is None else [b"NaT" if v is None else v for v in values]
+        # DATETIME values contain a space, so they are split on NUL instead
+        tokens = np.array(b"\x00".join(present).split(b"\x00"), dtype="S")
+        return tokens.astype(DATE_TYPES[type_code]), mask
+
+    present = values if mask is None else [b"" if v is None else v for v in values]
+    # UTF-8 never encodes other characters with a NUL byte, so the chunk is decoded in one call
+    # unless a value contains NUL itself
+    joined = b"\x00".join(present)
+    if joined.count(b"\x00") == len(present) - 1:
+        strings = joined.decode("utf-8").split("\x00")
+    else:
+        strings = [bytes(v).decode("utf-8") for v in present]
+    column = np.empty(len(strings), dtype=object)
+    column[:] = strings
+    return column, mask
+
+
+def finish_column(chunks, type_code):
+    """
+    Concatenates the decoded chunks of a column and applies its NULLs.
+
+    :param chunks: list of (values array, NULL mask or None) from decode_chunk.
+    :param type_code: MySQL field type from cursor.description.
+    :return: a NumPy array or pandas extension array.
+    """
+    if not chunks:
+        return np.array([], dtype=object)
+    column = np.concatenate([values for values, _ in chunks])
+    if all(mask is None for _, mask in chunks):
+        return column
+    mask = np.concatenate([np.zeros(len(values), dtype=bool) if mask is None else mask for values, mask in chunks])
+    if type_code in INTEGER_TYPES:
+        return pd.arrays.IntegerArray(column, mask)
+    if type_code in FLOAT_TYPES:
+        column[mask] = np.nan
+    elif type_code not in DATE_TYPES:
+        column[mask] = None
+    return column
+
+
+def decode_column(values, type_code):
+    """
+    Decodes one column of raw (bytes) values using its MySQL type.
+    Numeric, date and text columns are parsed by NumPy or a single decode call instead of one Python
+    object per cell.
+
+    :param values: tuple of bytes/bytearray values (None for NULL).
+    :param type_code: MySQL field type from cursor.description.
+    :return: a NumPy array or pandas extension array.
+    """
+    return finish_column([decode_chunk(values, type_code)] if values else [], type_code)
+
+
+def fetch_columns(cursor, backend="numpy", chunk_rows=CHUNK_ROWS):
+    """
+    Fetches the result set of a raw cursor (connection.cursor(raw=True)) as a column-typed DataFrame.
+    Rows are fetched chunk_rows at a time and every chunk is decoded straight into per-column buffers,
+    so the raw rows of the whole result set are never held at once.
+
+    :param cursor: raw cursor with an executed query.
+    :param backend: "numpy" for NumPy-backed columns or "arrow" for Arrow-backed columns (requires pyarrow).
+    :param chunk_rows: rows fetched and decoded per chunk.
+    :return: DataFrame with one typed column per result column.
+    """
+    column_names = [desc[0] for desc in cursor.description]
+    type_codes = [desc[1] for desc in cursor.description]
+    chunks = [[] for _ in column_names]
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            break
+        for column, values, type_code in zip(chunks, zip(*rows), type_codes):
+            column.append(decode_chunk(values, type_code))
+
+    df = pd.DataFrame({
+        name: finish_column(column, type_code)
+        for name, column, type_code in zip(column_names, chunks, type_codes)
+    }, columns=column_names)
+
+    if backend == "arrow":
+        try:
+            import pyarrow  # noqa: F401  (optional dependency)
+        except ImportError:
+            print("pyarrow is not installed, returning NumPy-backed columns.")
+            return df
+        df = df.convert_dtypes(dtype_backend="pyarrow")
+    return df
@@ -166,6 +166,21 @@ def create_database_schema(cursor):
     print("database schema created successfully.")
 
 
+def create_ngram_index(cursor):
+    """
+    Adds an n-gram FULLTEXT index over Movies(title, overview), used by search_movies(ngram=True).
+    The ngram parser indexes every ngram_token_size-character sequence, so short tokens and
+    partial words can be searched (at the cost of a larger index).
+
+    :param cursor: A database cursor object used to execute SQL queries.
+    """
+    try:
+        cursor.execute("ALTER TABLE Movies ADD FULLTEXT ft_movies_title_overview_ngram (title, overview) WITH PARSER ngram;")
+        print("+ n-gram FULLTEXT index added to Movies(title, overview)")
+    except Exception as e:
+        print(f"Error adding n-gram FULLTEXT index: {e}")
+
+
 def drop_all_tables(cursor, connection):
     """
     Drops all tables in the current database.
@@ -0,0 +1,94 @@
+""" Benchmarks search_movies against the former derived-table query_1 on synthetic copies of Movies. """
+
+import time
+import statistics
+
+from src.queries_db_script import search_movies
+
+
+SYNTHETIC_TABLE = "Movies_Synthetic"
+
+# query_1 before search_movies: relevance is computed for every movie and filtered afterwards
+LEGACY_QUERY = """
+            SELECT movie_id, title, overview, popularity, relevance
+            FROM (
+                SELECT movie_id, title, overview, popularity,
+                       MATCH(overview) AGAINST (%s IN NATURAL LANGUAGE MODE) AS relevance
+                FROM {table}
+            ) AS subquery
+            WHERE relevance > 0
+            ORDER BY relevance DESC, popularity DESC
+            LIMIT %s;
+            """
+
+
+def create_synthetic_movies(cursor, connection, scale):
+    """
+    Creates Movies_Synthetic with `scale` copies of Movies (ids shifted per copy) and the same indexes.
+
+    :param cursor: Database cursor for executing queries.
+    :param connection: connection to database.
+    :param scale: number of copies of Movies.
+    """
+    print(f"creating {SYNTHETIC_TABLE} at scale {scale}...")
+    cursor.execute(f"DROP TABLE IF EXISTS {SYNTHETIC_TABLE};")
+    cursor.execute(f"CREATE TABLE {SYNTHETIC_TABLE} LIKE Movies;")
+    cursor.execute("SELECT MAX(movie_id) + 1 FROM Movies;")
+    offset = cursor.fetchone()[0] or 1
+    cursor.execute("DESCRIBE Movies;")
+    columns = [row[0] for row in cursor.fetchall()]
+    shifted = ", ".join("movie_id + %s" if column == "movie_id" else column for column in columns)
+    for copy in range(scale):
+        cursor.execute(f"INSERT INTO {SYNTHETIC_TABLE} ({', '.join(columns)}) SELECT {shifted} FROM Movies;",
+                       (copy * offset,))
+        connection.commit()
+
+
+def time_query(run, repeat):
+    """
+    Returns the median wall time of run() in milliseconds, after one warm-up run.
+    """
+    run()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def benchmark_search(connection, keywords=("future galaxy", "love", "war hero"), scales=(1, 10, 50),
+                     limit=10, repeat=5):
+    """
+    Times the former query_1 and search_movies (every mode) for each keyword and synthetic scale,
+    then drops the synthetic table.
+
+    :param connection: connection to database.
+    :param keywords: search texts to benchmark.
+    :param scales: numbers of copies of Movies.
+    :param limit: result limit of every search.
+    :param repeat: timed runs per measurement.
+    :return: list of (scale, keyword, variant, median_ms).
+    """
+    cursor = connection.cursor()
+    report = []
+    try:
+        for scale in scales:
+            create_synthetic_movies(cursor, connection, scale)
+
+            def legacy(keyword):
+                cursor.execute(LEGACY_QUERY.format(table=SYNTHETIC_TABLE), (keyword, limit))
+                cursor.fetchall()
+
+            for keyword in keywords:
+                report.append((scale, keyword, "legacy query_1", time_query(lambda: legacy(keyword), repeat)))
+                for mode in ("natural", "boolean", "phrase", "expansion"):
+                    run = lambda: search_movies(connection, keyword, mode=mode, limit=limit, table=SYNTHETIC_TABLE)
+                    report.append((scale, keyword, f"search_movies {mode}", time_query(run, repeat)))
+    finally:
+        cursor.execute(f"DROP TABLE IF EXISTS {SYNTHETIC_TABLE};")
+        cursor.close()
+
+    for scale, keyword, variant, median_ms in report:
+        print(f"x{scale:<6}{keyword[:20]:<22}{variant:<28}{median_ms:10.2f} ms")
+    return report
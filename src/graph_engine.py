@@ -0,0 +1,265 @@
+""" In-process graph engine: answers query_2, query_4 and query_6 with traversals over NumPy CSR arrays. """
+
+import re
+
+import numpy as np
+
+from src.queries_db_script import query_2, query_4, query_6
+from src.title_index import fold_name
+
+
+# InnoDB FULLTEXT defaults: shorter words and the default stopwords are neither indexed nor searched
+FT_MIN_TOKEN_SIZE = 3   # innodb_ft_min_token_size
+FT_STOPWORDS = frozenset("""
+    a about an are as at be by com de en for from how i in is it la of on or that the this to was what when
+    where who will with und www""".split())   # INFORMATION_SCHEMA.INNODB_FT_DEFAULT_STOPWORD
+
+
+def _fetch(connection, query):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(query)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def build_csr(sources, targets, num_sources):
+    """
+    Builds a CSR adjacency from an edge list. Duplicate edges are kept (they are counted like SQL join rows).
+
+    :param sources: int32 array of dense source indices.
+    :param targets: int32 array of dense target indices.
+    :param num_sources: number of source nodes.
+    :return: (indptr, indices) arrays; the neighbours of node i are indices[indptr[i]:indptr[i + 1]].
+    """
+    order = np.argsort(sources, kind="stable")
+    indptr = np.zeros(num_sources + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=num_sources), out=indptr[1:])
+    return indptr, targets[order].astype(np.int32)
+
+
+def gather(indptr, indices, nodes):
+    """
+    Returns the concatenated neighbours of several nodes, without a Python loop.
+
+    :param indptr: CSR index pointer.
+    :param indices: CSR neighbour indices.
+    :param nodes: array of source nodes.
+    :return: int32 array of neighbours (with repetitions).
+    """
+    starts, ends = indptr[nodes], indptr[nodes + 1]
+    lengths = ends - starts
+    if lengths.sum() == 0:
+        return np.empty(0, dtype=np.int32)
+    # position of every output element inside `indices`: its run's start plus its offset in the run
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return indices[np.repeat(starts, lengths) + offsets]
+
+
+def fulltext_tokens(text):
+    """
+    Returns the folded words of a text that an InnoDB FULLTEXT index would index or search
+    ("Robert De Niro" -> {"robert", "niro"}).
+    """
+    return {word for word in re.findall(r"\w+", fold_name(text))
+            if len(word) >= FT_MIN_TOKEN_SIZE and word not in FT_STOPWORDS}
+
+
+class GraphEngine:
+    """
+    Movies, actors and keywords as dense int32 nodes, with link tables stored as CSR adjacency arrays
+    (both directions) and movie attributes in parallel typed arrays.
+
+    Build with GraphEngine.from_database(connection); rebuilding after a load costs one SELECT per table.
+    """
+
+    def __init__(self, movies, actors, genres, movies_genres, movies_actors, movies_keywords):
+        """
+        :param movies: rows of (movie_id, title, popularity, vote_average, revenue, budget).
+        :param actors: rows of (actor_id, name).
+        :param genres: rows of (genre_id, genre_name).
+        :param movies_genres: rows of (movie_id, genre_id).
+        :param movies_actors: rows of (movie_id, actor_id), one per Movies_Actors row.
+        :param movies_keywords: rows of (movie_id, keyword_id).
+        """
+        movie_ids, titles, popularity, vote_average, revenue, budget = zip(*movies) if movies else ([],) * 6
+        self.movie_ids = np.asarray(movie_ids, dtype=np.int32)
+        self.titles = np.asarray(titles, dtype=object)
+        # title lookups compare like MySQL's case- and accent-insensitive collation
+        self._folded_titles = np.asarray([fold_name(title) for title in titles], dtype=object)
+        # FLOAT columns are single precision in MySQL; keeping float32 reproduces its comparisons
+        self.popularity = np.asarray(popularity, dtype=np.float32)
+        self.vote_average = np.asarray(vote_average, dtype=np.float32)
+        self.revenue = np.asarray(revenue, dtype=np.int64)
+        self.budget = np.asarray(budget, dtype=np.int64)
+
+        self.actor_ids = np.asarray([actor_id for actor_id, _ in actors], dtype=np.int32)
+        self.actor_names = np.asarray([name for _, name in actors], dtype=object)
+        # genre names compare case-insensitively, like the _ci collation of Genres.genre_name
+        self.genre_by_name = {fold_name(name): genre_id for genre_id, name in genres}
+
+        movie_index = self._index(self.movie_ids)
+        actor_index = self._index(self.actor_ids)
+
+        genre_movies, genre_ids = self._edges(movies_genres)
+        self.genre_ids = np.unique(genre_ids)
+        genre_nodes = np.searchsorted(self.genre_ids, genre_ids).astype(np.int32)
+        self.genre_movies = build_csr(genre_nodes, movie_index(genre_movies), len(self.genre_ids))
+
+        edge_movies, edge_actors = self._edges(movies_actors)
+        edge_movies, edge_actors = movie_index(edge_movies), actor_index(edge_actors)
+        self.movie_actors = build_csr(edge_movies, edge_actors, len(self.movie_ids))
+        self.actor_movies = build_csr(edge_actors, edge_movies, len(self.actor_ids))
+
+        edge_movies, keyword_ids = self._edges(movies_keywords)
+        self.keyword_ids = np.unique(keyword_ids)
+        edge_movies = movie_index(edge_movies)
+        edge_keywords = np.searchsorted(self.keyword_ids, keyword_ids).astype(np.int32)
+        self.movie_keywords = build_csr(edge_movies, edge_keywords, len(self.movie_ids))
+        self.keyword_movies = build_csr(edge_keywords, edge_movies, len(self.keyword_ids))
+
+        # inverted index from FULLTEXT name token to actors, for the name match of query_2
+        self.token_ids = {}
+        token_nodes, token_actors = [], []
+        for actor, name in enumerate(self.actor_names):
+            for token in fulltext_tokens(name):
+                token_nodes.append(self.token_ids.setdefault(token, len(self.token_ids)))
+                token_actors.append(actor)
+        self.token_actors = build_csr(np.asarray(token_nodes, dtype=np.int32),
+                                      np.asarray(token_actors, dtype=np.int32), len(self.token_ids))
+
+    @classmethod
+    def from_database(cls, connection):
+        """
+        Loads the graph from the database.
+
+        :param connection: connection to database.
+        :return: a GraphEngine.
+        """
+        print("building graph engine...")
+        return cls(
+            movies=_fetch(connection, """
+                SELECT movie_id, title, popularity, vote_average, revenue, budget FROM Movies ORDER BY movie_id;"""),
+            actors=_fetch(connection, "SELECT actor_id, name FROM Actors ORDER BY actor_id;"),
+            genres=_fetch(connection, "SELECT genre_id, genre_name FROM Genres;"),
+            movies_genres=_fetch(connection, "SELECT movie_id, genre_id FROM Movies_Genres;"),
+            movies_actors=_fetch(connection, "SELECT movie_id, actor_id FROM Movies_Actors;"),
+            movies_keywords=_fetch(connection, "SELECT movie_id, keyword_id FROM Movies_Keywords;"),
+        )
+
+    @staticmethod
+    def _index(sorted_ids):
+        """
+        Returns a function mapping database ids to dense node indices (ids must be sorted).
+        """
+        return lambda ids: np.searchsorted(sorted_ids, ids).astype(np.int32)
+
+    @staticmethod
+    def _edges(rows):
+        if not rows:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+        edges = np.asarray(rows, dtype=np.int32)
+        return edges[:, 0], edges[:, 1]
+
+    def query_2(self, keyword):
+        """
+        Finds actors with the same name (e.g. last or first) and counts how many movies they appeared in.
+        (name tokens -> actors -> movies; names match on any word FULLTEXT would search, see fulltext_tokens.)
+        """
+        tokens = [self.token_ids[token] for token in fulltext_tokens(keyword) if token in self.token_ids]
+        actors = np.unique(gather(*self.token_actors, np.asarray(tokens, dtype=np.int64))).astype(np.int64)
+        if len(actors) == 0:
+            return [], ["actor_id", "name", "movie_count"]
+        indptr, _ = self.actor_movies
+        counts = indptr[actors + 1] - indptr[actors]
+        keep = counts > 0
+        actors, counts = actors[keep], counts[keep]
+        order = np.argsort(-counts, kind="stable")
+        results = [(int(self.actor_ids[a]), self.actor_names[a], int(c)) for a, c in zip(actors[order], counts[order])]
+        return results, ["actor_id", "name", "movie_count"]
+
+    def query_4(self, genre, limit=10):
+        """
+        Finds 10 actors who appeared in movies of a given genre with a vote average above the genre's average.
+        (genre -> movies -> actors.)
+        """
+        column_names = ["actor_id", "name", "high_rated_movies"]
+        genre_id = self.genre_by_name.get(fold_name(genre))
+        if genre_id is None or genre_id not in self.genre_ids:
+            return [], column_names
+        indptr, indices = self.genre_movies
+        node = np.searchsorted(self.genre_ids, genre_id)
+        movies = indices[indptr[node]:indptr[node + 1]]
+
+        votes = self.vote_average[movies]
+        # MySQL averages FLOAT columns in double precision
+        high_rated = movies[votes > votes.astype(np.float64).mean()]
+        actors = gather(*self.movie_actors, high_rated.astype(np.int64))
+        counts = np.bincount(actors, minlength=len(self.actor_ids))
+
+        top = np.flatnonzero(counts)
+        top = top[np.argsort(-counts[top], kind="stable")][:limit]
+        results = [(int(self.actor_ids[a]), self.actor_names[a], int(counts[a])) for a in top]
+        return results, column_names
+
+    def query_6(self, movie_title, limit=10):
+        """
+        Suggests movies related to the given title based on shared keywords, ranked by popularity.
+        (movie -> keywords -> movies.)
+        """
+        column_names = ["movie_id", "title", "popularity", "shared_keywords"]
+        folded_title = fold_name(movie_title)
+        if not folded_title:
+            return [], column_names
+        candidates = np.flatnonzero(self._folded_titles == folded_title)
+        if len(candidates) == 0:
+            return [], column_names
+        seed = candidates[np.argmax(self.popularity[candidates])]
+
+        keywords = gather(*self.movie_keywords, np.asarray([seed], dtype=np.int64))
+        movies = gather(*self.keyword_movies, keywords.astype(np.int64))
+        shared = np.bincount(movies, minlength=len(self.movie_ids))
+        shared[seed] = 0
+
+        related = np.flatnonzero(shared)
+        # lexsort uses the last key as the primary one
+        related = related[np.lexsort((-self.popularity[related], -shared[related]))][:limit]
+        results = [(int(self.movie_ids[m]), self.titles[m], float(self.popularity[m]), int(shared[m]))
+                   for m in related]
+        return results, column_names
+
+
+def cross_check(connection, engine, genres=("Drama", "Comedy"), names=("Skarsgard", "Fonda", "De Niro", "Al"),
+                titles=("The Hitchhiker's Guide to the Galaxy", "Avatar")):
+    """
+    Compares the engine's answers with the SQL queries.
+    Rows are compared by their ranking values; rows that tie on the last reported value may legitimately
+    differ, since neither the SQL nor the engine orders ties.
+
+    :param connection: connection to database.
+    :param engine: a GraphEngine built from the same database.
+    :return: True if every answer matches.
+    """
+    def same(sql_results, engine_results, score):
+        if [score(row) for row in sql_results] != [score(row) for row in engine_results]:
+            return False
+        if not sql_results:
+            return True
+        boundary = score(sql_results[-1])
+        strict = lambda rows: sorted(row[0] for row in rows if score(row) != boundary)
+        return strict(sql_results) == strict(engine_results)
+
+    checks = [(query_2, engine.query_2, name, lambda row: row[2]) for name in names]
+    checks += [(query_4, engine.query_4, genre, lambda row: row[2]) for genre in genres]
+    checks += [(query_6, engine.query_6, title, lambda row: (row[3], round(row[2], 4))) for title in titles]
+
+    ok = True
+    for sql_query, engine_query, argument, score in checks:
+        sql_results, _ = sql_query(connection, argument)
+        engine_results, _ = engine_query(argument)
+        matched = same(list(sql_results), engine_results, score)
+        ok = ok and matched
+        print(f"{'+' if matched else '!'} {sql_query.__name__}({argument!r}): "
+              f"{'match' if matched else 'MISMATCH'} ({len(sql_results)} rows)")
+    return ok
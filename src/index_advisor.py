@@ -0,0 +1,511 @@
+""" Replays a workload of query functions under EXPLAIN and measures proposed index changes. """
+
+import re
+import json
+import time
+import statistics
+
+from src.queries_db_script import query_1, query_2, query_3, query_4, query_5, query_6
+
+
+# the same calls main.py runs, used when no recorded workload is given
+DEFAULT_WORKLOAD = [
+    (query_1, ("future galaxy",)),
+    (query_2, ("Skarsgard",)),
+    (query_3, ("Comedy",)),
+    (query_4, ("Drama",)),
+    (query_5, ()),
+    (query_6, ("The Hitchhiker's Guide to the Galaxy",)),
+]
+
+QUERY_FUNCTIONS = {func.__name__: func for func, _ in DEFAULT_WORKLOAD}
+
+SCRATCH_SUFFIX = "_advisor_scratch"
+MAX_INDEX_COLUMNS = 4       # wider composite indexes rarely pay for their write cost
+MAX_KEY_VARCHAR = 64        # VARCHAR columns longer than this are flagged inside primary keys
+
+# matches `schema`.`alias`.`column` references inside EXPLAIN conditions
+COLUMN_REF = re.compile(r"`(\w+)`\.`(\w+)`\.`(\w+)`")
+
+
+class _RecordingCursor:
+    """
+    Wraps a cursor and records every statement executed through it.
+    """
+
+    def __init__(self, cursor, statements):
+        self._cursor = cursor
+        self._statements = statements
+
+    def execute(self, operation, params=None):
+        self._statements.append((operation, params))
+        return self._cursor.execute(operation, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _RecordingConnection:
+    """
+    Wraps a connection so that the SQL issued by a query function can be captured without changing it.
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+        self.statements = []
+
+    def cursor(self, *args, **kwargs):
+        return _RecordingCursor(self._connection.cursor(*args, **kwargs), self.statements)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+def load_workload(path):
+    """
+    Loads a recorded workload from a JSON file of the form [{"query": "query_1", "args": ["future galaxy"]}, ...].
+
+    :param path: path to the JSON file.
+    :return: a list of (query_func, args) tuples.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    return [(QUERY_FUNCTIONS[entry["query"]], tuple(entry.get("args", []))) for entry in entries]
+
+
+def capture_statements(connection, query_func, args):
+    """
+    Runs a query function once and returns the statements it executed.
+
+    :param connection: connection to database.
+    :param query_func: query function to run.
+    :param args: arguments to pass to query_func.
+    :return: a list of (sql, params) tuples.
+    """
+    recorder = _RecordingConnection(connection)
+    query_func(recorder, *args)
+    return recorder.statements
+
+
+def explain_statement(connection, sql, params):
+    """
+    Returns the parsed EXPLAIN FORMAT=JSON plan of a statement.
+
+    :param connection: connection to database.
+    :param sql: statement to explain.
+    :param params: parameters of the statement.
+    :return: the plan as a dictionary.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute("EXPLAIN FORMAT=JSON " + sql, params)
+        return json.loads(cursor.fetchone()[0])
+    finally:
+        cursor.close()
+
+
+def find_plan_issues(plan):
+    """
+    Walks an EXPLAIN FORMAT=JSON plan and collects full scans, filesorts and temporary tables.
+
+    :param plan: the plan as a dictionary.
+    :return: a list of issue dictionaries with keys 'issue', 'table', 'columns' and 'condition_columns'.
+    """
+    issues = []
+
+    def first_table(node):
+        # the driving table of a nested loop is the one a grouping/ordering operation reads first
+        if isinstance(node, dict):
+            if "table" in node:
+                return node["table"]
+            for value in node.values():
+                found = first_table(value)
+                if found:
+                    return found
+        elif isinstance(node, list):
+            for value in node:
+                found = first_table(value)
+                if found:
+                    return found
+        return None
+
+    def walk(node):
+        if isinstance(node, list):
+            for value in node:
+                walk(value)
+            return
+        if not isinstance(node, dict):
+            return
+
+        for flag, issue in (("using_filesort", "filesort"), ("using_temporary_table", "temporary table")):
+            if node.get(flag):
+                table = first_table(node) or {}
+                issues.append({
+                    "issue": issue,
+                    "table": table.get("table_name"),
+                    "columns": table.get("used_columns", []),
+                    "condition_columns": _condition_columns(table),
+                })
+
+        table = node.get("table")
+        if isinstance(table, dict) and table.get("access_type") in ("ALL", "index"):
+            issues.append({
+                "issue": "full table scan" if table["access_type"] == "ALL" else "full index scan",
+                "table": table.get("table_name"),
+                "columns": table.get("used_columns", []),
+                "condition_columns": _condition_columns(table),
+            })
+
+        for value in node.values():
+            walk(value)
+
+    walk(plan)
+    return issues
+
+
+def _condition_columns(table):
+    """
+    Extracts the columns of a plan table that appear in its attached condition, equality columns first.
+    """
+    condition = table.get("attached_condition", "")
+    alias = table.get("table_name")
+    equality, other = [], []
+    for match in COLUMN_REF.finditer(condition):
+        if match.group(2) != alias:
+            continue
+        column = match.group(3)
+        if column in equality or column in other:
+            continue
+        # an equality predicate lets the column lead the index
+        if re.match(r"\s*=", condition[match.end():]):
+            equality.append(column)
+        else:
+            other.append(column)
+    return equality + other
+
+
+def resolve_table(cursor, alias, statements):
+    """
+    Resolves a plan table alias (e.g. 'ma') to the base table name it refers to.
+
+    :param cursor: Database cursor for executing queries.
+    :param alias: table alias as reported by EXPLAIN.
+    :param statements: statements the alias appeared in.
+    :return: the base table name, or None for derived tables and CTEs.
+    """
+    for sql, _ in statements:
+        match = re.search(r"(?:FROM|JOIN)\s+(\w+)\s+(?:AS\s+)?" + re.escape(alias) + r"\b", sql, re.IGNORECASE)
+        if match:
+            return match.group(1)
+    cursor.execute("SHOW TABLES;")
+    tables = {name.lower(): name for (name,) in cursor.fetchall()}
+    return tables.get(alias.lower())
+
+
+def propose_indexes(cursor, issues, statements):
+    """
+    Turns plan issues into composite/covering index proposals.
+    Condition columns lead the index, and the remaining used columns are appended to make it covering.
+
+    :param cursor: Database cursor for executing queries.
+    :param issues: issues found by find_plan_issues.
+    :param statements: statements the issues were found in.
+    :return: a list of proposal dictionaries.
+    """
+    proposals = []
+    for issue in issues:
+        if not issue["table"]:
+            continue
+        table_name = resolve_table(cursor, issue["table"], statements)
+        if table_name is None:
+            continue
+
+        column_types = get_column_types(cursor, table_name)
+        columns = []
+        for column in issue["condition_columns"] + issue["columns"]:
+            # TEXT-like and long VARCHAR columns are served by FULLTEXT indexes, not b-trees
+            if column in column_types and column not in columns and _indexable(column_types[column]):
+                columns.append(column)
+        columns = columns[:MAX_INDEX_COLUMNS]
+        if not columns or columns in existing_index_prefixes(cursor, table_name):
+            continue
+
+        index_name = f"idx_adv_{table_name.lower()}_{'_'.join(columns)}"[:64]
+        if any(p["name"] == index_name for p in proposals):
+            continue
+        proposals.append({
+            "name": index_name,
+            "table": table_name,
+            "reason": f"{issue['issue']} on {table_name}",
+            "apply": [f"CREATE INDEX {index_name} ON {table_name}({', '.join(columns)});"],
+            "revert": [f"DROP INDEX {index_name} ON {table_name};"],
+        })
+    return proposals
+
+
+def propose_narrower_keys(cursor):
+    """
+    Proposes replacing primary keys that contain long VARCHAR columns (e.g. Movies_Actors.character_name)
+    with a surrogate key. Every secondary index of an InnoDB table carries a copy of the primary key,
+    so a wide key bloats all of them.
+
+    :param cursor: Database cursor for executing queries.
+    :return: a list of proposal dictionaries.
+    """
+    cursor.execute("""
+        SELECT k.TABLE_NAME, k.COLUMN_NAME, c.DATA_TYPE, c.CHARACTER_MAXIMUM_LENGTH
+        FROM information_schema.KEY_COLUMN_USAGE k
+        JOIN information_schema.COLUMNS c
+          ON c.TABLE_SCHEMA = k.TABLE_SCHEMA AND c.TABLE_NAME = k.TABLE_NAME AND c.COLUMN_NAME = k.COLUMN_NAME
+        WHERE k.TABLE_SCHEMA = DATABASE() AND k.CONSTRAINT_NAME = 'PRIMARY'
+        ORDER BY k.TABLE_NAME, k.ORDINAL_POSITION;
+        """)
+    keys = {}
+    for table_name, column, data_type, max_length in cursor.fetchall():
+        keys.setdefault(table_name, []).append((column, data_type, max_length))
+
+    proposals = []
+    for table_name, key_columns in keys.items():
+        wide = [c for c, t, length in key_columns if t == "varchar" and (length or 0) > MAX_KEY_VARCHAR]
+        if not wide:
+            continue
+        narrow = [c for c, t, length in key_columns if c not in wide]
+        surrogate = f"{table_name.lower()}_id"
+        # the old key's uniqueness is kept with a unique index over the narrow columns and a 16-byte hash
+        # of every wide column, instead of the full VARCHAR values; the hash is taken over the collation's
+        # sort weights, so values the old key treated as equal (e.g. differing only in case) still collide
+        hashes = [f"{column}_hash" for column in wide]
+        proposals.append({
+            "name": f"pk_adv_{table_name.lower()}",
+            "table": table_name,
+            "reason": f"primary key of {table_name} includes {', '.join(wide)}",
+            "note": f"uniqueness of ({', '.join(narrow + wide)}) is kept through MD5 hashes of the collation "
+                    f"weights of {', '.join(wide)}",
+            "apply": [
+                f"ALTER TABLE {table_name} DROP PRIMARY KEY, "
+                f"ADD COLUMN {surrogate} INT NOT NULL AUTO_INCREMENT PRIMARY KEY FIRST, "
+                + "".join(f"ADD COLUMN {hash_column} BINARY(16) AS (UNHEX(MD5(WEIGHT_STRING({column})))) STORED, "
+                          for hash_column, column in zip(hashes, wide))
+                + f"ADD UNIQUE INDEX idx_adv_{table_name.lower()}_key ({', '.join(narrow + hashes)});"
+            ],
+            "revert": None,     # the table is re-copied from the source database instead
+        })
+    return proposals
+
+
+def get_column_types(cursor, table_name):
+    """
+    Returns a mapping of column name to (data type, maximum character length) for a table.
+    """
+    cursor.execute("""
+        SELECT COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s;
+        """, (table_name,))
+    return {column: (data_type, length) for column, data_type, length in cursor.fetchall()}
+
+
+def existing_index_prefixes(cursor, table_name):
+    """
+    Returns the column lists of all existing indexes of a table, including their left prefixes.
+    """
+    cursor.execute(f"SHOW INDEX FROM {table_name};")
+    indexes = {}
+    for row in cursor.fetchall():
+        # SHOW INDEX columns: Table, Non_unique, Key_name, Seq_in_index, Column_name, ...
+        indexes.setdefault(row[2], []).append((row[3], row[4]))
+    prefixes = []
+    for parts in indexes.values():
+        columns = [column for _, column in sorted(parts)]
+        prefixes.extend(columns[:i] for i in range(1, len(columns) + 1))
+    return prefixes
+
+
+def _indexable(column_type):
+    data_type, length = column_type
+    if data_type in ("text", "mediumtext", "longtext", "blob", "json"):
+        return False
+    return not (data_type == "varchar" and (length or 0) > 255)
+
+
+def create_scratch_copy(cursor, connection, source_db):
+    """
+    Copies every table of the source database (data and indexes) into a scratch database.
+
+    :param cursor: Database cursor for executing queries.
+    :param connection: connection to database.
+    :param source_db: name of the database to copy.
+    :return: the scratch database name.
+    """
+    scratch_db = source_db + SCRATCH_SUFFIX
+    print(f"creating scratch copy {scratch_db}...")
+    cursor.execute(f"DROP DATABASE IF EXISTS {scratch_db};")
+    cursor.execute(f"CREATE DATABASE {scratch_db};")
+    cursor.execute(f"SHOW TABLES FROM {source_db};")
+    for (table_name,) in cursor.fetchall():
+        copy_table(cursor, source_db, scratch_db, table_name)
+        print(f"+ {table_name} was copied")
+    connection.commit()
+    return scratch_db
+
+
+def copy_table(cursor, source_db, target_db, table_name):
+    """
+    (Re)creates a table in the target database as a copy of the source table.
+    """
+    cursor.execute(f"DROP TABLE IF EXISTS {target_db}.{table_name};")
+    cursor.execute(f"CREATE TABLE {target_db}.{table_name} LIKE {source_db}.{table_name};")
+    cursor.execute(f"INSERT INTO {target_db}.{table_name} SELECT * FROM {source_db}.{table_name};")
+
+
+def measure_workload(connection, workload, repeat=5):
+    """
+    Measures the median latency of every call in the workload and keeps its result set.
+
+    :param connection: connection to database.
+    :param workload: a list of (query_func, args) tuples.
+    :param repeat: number of timed runs per call.
+    :return: (median latencies in milliseconds, result sets), both aligned with the workload.
+    """
+    latencies, result_sets = [], []
+    for query_func, args in workload:
+        query_func(connection, *args)  # warm up the buffer pool
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results, _ = query_func(connection, *args)
+            timings.append((time.perf_counter() - start) * 1000)
+        latencies.append(statistics.median(timings))
+        result_sets.append(sorted(map(repr, results)))
+    return latencies, result_sets
+
+
+def changed_results(workload, baseline_results, results):
+    """
+    Returns the labels of the workload calls whose result set is empty or differs from the baseline.
+    The query_* functions return no rows when they fail, so a broken query would otherwise look fast.
+    """
+    return [label for label, before, after in zip(workload_labels(workload), baseline_results, results)
+            if not after or after != before]
+
+
+def advise_indexes(connection, workload=None, repeat=5, apply=True):
+    """
+    Replays the workload under EXPLAIN FORMAT=JSON, reports full scans, filesorts and temporary tables,
+    proposes composite/covering indexes and narrower keys, then applies each proposal to a scratch copy
+    of the database and measures the workload latency before and after it.
+
+    The source database is never modified; proposals are applied and reverted one at a time in the scratch copy.
+
+    :param connection: connection to database.
+    :param workload: a list of (query_func, args) tuples (default: DEFAULT_WORKLOAD).
+    :param repeat: number of timed runs per call.
+    :param apply: whether to measure the proposals on a scratch copy.
+    :return: a list of proposal dictionaries, each with its measured 'before_ms' and 'after_ms' latencies,
+             and a 'failed' reason if it could not be applied or changed (or emptied) a query's results.
+    """
+    workload = workload or DEFAULT_WORKLOAD
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT DATABASE();")
+        source_db = cursor.fetchone()[0]
+
+        print("replaying workload under EXPLAIN...")
+        issues, statements = [], []
+        for query_func, args in workload:
+            for sql, params in capture_statements(connection, query_func, args):
+                statements.append((sql, params))
+                for issue in find_plan_issues(explain_statement(connection, sql, params)):
+                    issue["query"] = query_func.__name__
+                    issues.append(issue)
+                    print(f"! {query_func.__name__}: {issue['issue']} on {issue['table']}")
+
+        proposals = propose_indexes(cursor, issues, statements) + propose_narrower_keys(cursor)
+        for proposal in proposals:
+            print(f"? {proposal['name']}: {proposal['reason']}")
+            if proposal.get("note"):
+                print(f"  note: {proposal['note']}")
+
+        if not apply or not proposals:
+            return proposals
+
+        scratch_db = create_scratch_copy(cursor, connection, source_db)
+        try:
+            cursor.execute(f"USE {scratch_db};")
+            baseline, baseline_results = measure_workload(connection, workload, repeat)
+            for label, results in zip(workload_labels(workload), baseline_results):
+                if not results:
+                    print(f"! {label} returns no rows, so no proposal can be validated against it")
+            for proposal in proposals:
+                try:
+                    for statement in proposal["apply"]:
+                        cursor.execute(statement)
+                    after, results = measure_workload(connection, workload, repeat)
+                except Exception as e:
+                    print(f"Error applying {proposal['name']}: {e}")
+                    proposal["failed"] = f"could not be applied: {e}"
+                    continue
+                finally:
+                    _revert(cursor, proposal, source_db, scratch_db)
+
+                changed = changed_results(workload, baseline_results, results)
+                if changed:
+                    proposal["failed"] = f"results changed or empty for {', '.join(changed)}"
+
+                # keyed by workload position, so repeated calls of the same query keep their own timings
+                labels = workload_labels(workload)
+                proposal["before_ms"] = dict(zip(labels, baseline))
+                proposal["after_ms"] = dict(zip(labels, after))
+        finally:
+            cursor.execute(f"USE {source_db};")
+            cursor.execute(f"DROP DATABASE IF EXISTS {scratch_db};")
+
+        print_report(proposals)
+        return proposals
+
+    finally:
+        cursor.close()
+
+
+def _revert(cursor, proposal, source_db, scratch_db):
+    """
+    Undoes a proposal in the scratch database so the next one is measured against the original schema.
+    """
+    try:
+        if proposal["revert"] is not None:
+            for statement in proposal["revert"]:
+                cursor.execute(statement)
+        else:
+            copy_table(cursor, source_db, scratch_db, proposal["table"])
+    except Exception as e:
+        print(f"Error reverting {proposal['name']}: {e}")
+
+
+def workload_labels(workload):
+    """
+    Labels every workload call by its position, name and arguments, e.g. "#2 query_2('Fonda',)".
+    """
+    return [f"#{i} {query_func.__name__}{args!r}" for i, (query_func, args) in enumerate(workload)]
+
+
+def print_report(proposals, max_width=48):
+    """
+    Prints the before/after latency of every measured proposal.
+
+    :param proposals: proposals returned by advise_indexes.
+    :param max_width: width of the query column.
+    """
+    for proposal in proposals:
+        if "after_ms" not in proposal:
+            continue
+        print(f"\n{proposal['name']} ({proposal['reason']})")
+        for statement in proposal["apply"]:
+            print(f"  {statement}")
+        if proposal.get("note"):
+            print(f"  note: {proposal['note']}")
+        if proposal.get("failed"):
+            print(f"  FAILED: {proposal['failed']}; the timings below are not comparable")
+        for label, before in proposal["before_ms"].items():
+            after = proposal["after_ms"][label]
+            change = (after - before) / before * 100 if before else 0.0
+            print(f"  {label[:max_width].ljust(max_width)}{before:10.2f} ms -> {after:10.2f} ms ({change:+.1f}%)")
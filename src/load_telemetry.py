@@ -0,0 +1,349 @@
+""" Loader telemetry: per-stage and per-table timings, throughput, batch latencies and profiler hooks. """
+
+import os
+import json
+import time
+import shutil
+import signal
+import cProfile
+import pstats
+import inspect
+import functools
+import subprocess
+from contextlib import contextmanager
+
+from config import config as cfg
+
+
+# upper bounds (ms) of the batch latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+_active = None   # the LoadTelemetry recording the current load, if any
+
+
+class LoadTelemetry:
+    """
+    Collects structured timings of one load run and exports them as JSON for run-to-run comparison.
+
+    Stages (read_csv, prepare, process_json_column, get_table_columns, table_exist, insert, ...) are timed per
+    table; every insert batch records its executemany latency and its commit time, and every table records
+    the bytes the server received while it was inserted (Bytes_received session status).
+
+    Stages nest (prepare runs process_json_column, insert runs table_exist, ...), so every stage records
+    its wall time and its self time, which excludes the stages run inside it; stages are ranked by self time.
+    """
+
+    def __init__(self, profile=None, output_dir=None):
+        """
+        :param profile: None, "cprofile" (deterministic, dumps a .prof file) or "sampling" (runs py-spy
+                        against this process, if it is installed).
+        :param output_dir: directory of the JSON report and profiles (default: cfg.TELEMETRY_DIR).
+        """
+        self.profile = profile
+        self.output_dir = output_dir or cfg.TELEMETRY_DIR
+        self.run_id = time.strftime("%Y%m%d-%H%M%S")
+        self.stages = {}        # (stage, table) -> {"calls", "wall_s", "self_s", "rows"}
+        self.tables = {}        # table -> insert statistics
+        self.started_at = None
+        self.wall_s = 0.0
+        self.error = None       # the exception that ended the load, if any
+        self.profile_files = []
+        self._profiler = None
+        self._sampler = None
+        self._sampler_path = None
+        self._bytes_before = {}
+        self._open_stages = []  # wall time of the stages run inside each open stage, innermost last
+
+    @contextmanager
+    def activate(self):
+        """
+        Makes this the active telemetry for the duration of a load and runs the optional profiler.
+        """
+        global _active
+        previous, _active = _active, self
+        self.started_at = time.time()
+        start = time.perf_counter()
+        self._start_profiler()
+        try:
+            yield self
+        except BaseException as e:
+            self.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._stop_profiler()
+            self.wall_s += time.perf_counter() - start
+            _active = previous
+
+    @contextmanager
+    def stage(self, name, table=None, rows=0):
+        """
+        Times a stage of the load.
+
+        :param name: stage name.
+        :param table: table (or column) the stage works on.
+        :param rows: number of rows the stage handled, if known upfront.
+        :return: a record whose "rows" can be set inside the block once the handled rows are known.
+        """
+        record = {"rows": rows}
+        start = self._open_stage()
+        try:
+            yield record
+        finally:
+            self.record_stage(name, table, *self._close_stage(start), record["rows"])
+
+    def _open_stage(self):
+        self._open_stages.append(0.0)
+        return time.perf_counter()
+
+    def _close_stage(self, start):
+        """
+        Closes the innermost open stage and returns its (wall time, self time).
+        """
+        wall_s = time.perf_counter() - start
+        children_s = self._open_stages.pop()
+        if self._open_stages:
+            self._open_stages[-1] += wall_s
+        return wall_s, wall_s - children_s
+
+    def record_stage(self, name, table, wall_s, self_s=None, rows=0):
+        record = self.stages.setdefault((name, table), {"calls": 0, "wall_s": 0.0, "self_s": 0.0, "rows": 0})
+        record["calls"] += 1
+        record["wall_s"] += wall_s
+        record["self_s"] += wall_s if self_s is None else self_s
+        record["rows"] += rows
+
+    def timed_tables(self, tables, name="prepare"):
+        """
+        Wraps a generator of (table_name, DataFrame) and times how long each table took to produce.
+        """
+        iterator = iter(tables)
+        while True:
+            start = self._open_stage()
+            try:
+                table_name, df = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                wall_s, self_s = self._close_stage(start)
+            self.record_stage(name, table_name, wall_s, self_s, len(df))
+            yield table_name, df
+
+    def begin_table(self, cursor, table_name):
+        """
+        Marks the start of a table insert, remembering the session's received-bytes counter.
+        """
+        self._bytes_before[table_name] = session_bytes_received(cursor)
+
+    def end_table(self, cursor, table_name, rows):
+        """
+        Marks the end of a table insert and records its row count and bytes sent.
+        """
+        table = self._table(table_name)
+        table["rows"] += rows
+        before = self._bytes_before.pop(table_name, None)
+        after = session_bytes_received(cursor)
+        if before is not None and after is not None:
+            table["bytes_sent"] += after - before
+
+    def record_batch(self, table_name, rows, execute_s, commit_s):
+        """
+        Records one insert batch: its executemany latency and its commit time.
+        """
+        table = self._table(table_name)
+        table["batches"] += 1
+        table["execute_s"] += execute_s
+        table["commit_s"] += commit_s
+        latency_ms = (execute_s + commit_s) * 1000
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if latency_ms <= bound),
+                      len(LATENCY_BUCKETS_MS))
+        table["batch_latency_histogram"][bucket] += 1
+        table["max_batch_ms"] = max(table["max_batch_ms"], latency_ms)
+
+    def _table(self, table_name):
+        return self.tables.setdefault(table_name, {
+            "rows": 0, "bytes_sent": 0, "batches": 0, "execute_s": 0.0, "commit_s": 0.0, "max_batch_ms": 0.0,
+            "batch_latency_histogram": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+        })
+
+    def _start_profiler(self):
+        if self.profile == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.profile == "sampling":
+            if shutil.which("py-spy") is None:
+                print("py-spy is not installed, sampling profiler disabled.")
+                return
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, f"load-{self.run_id}.speedscope.json")
+            self._sampler_path = path
+            self._sampler = subprocess.Popen(["py-spy", "record", "--pid", str(os.getpid()), "--format",
+                                              "speedscope", "--output", path], stdout=subprocess.DEVNULL)
+
+    def _stop_profiler(self):
+        if self._profiler is not None:
+            self._profiler.disable()
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, f"load-{self.run_id}.prof")
+            self._profiler.dump_stats(path)
+            self.profile_files.append(path)
+            self._profiler = None
+        if self._sampler is not None:
+            # py-spy writes its output when interrupted; this runs in activate()'s finally,
+            # so it must never raise and hide the load's own exception
+            try:
+                self._sampler.send_signal(signal.SIGINT)
+                self._sampler.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                print("py-spy did not stop in time, killing it.")
+                self._sampler.kill()
+            except OSError as e:
+                print(f"Error stopping py-spy: {e}")
+            self._sampler = None
+            # without ptrace rights py-spy cannot attach to its parent and writes nothing
+            if os.path.exists(self._sampler_path):
+                self.profile_files.append(self._sampler_path)
+            else:
+                print("py-spy wrote no profile (attaching to the process may need ptrace rights).")
+
+    def to_dict(self):
+        """
+        Returns the collected telemetry as a JSON-serializable dictionary.
+        """
+        tables = {}
+        for table_name, table in self.tables.items():
+            insert_s = table["execute_s"] + table["commit_s"]
+            tables[table_name] = {
+                **table,
+                "rows_per_s": table["rows"] / insert_s if insert_s else None,
+                "bytes_per_s": table["bytes_sent"] / insert_s if insert_s else None,
+            }
+        report = {
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "wall_s": self.wall_s,
+            "error": self.error,
+            "stages": [{"stage": name, "table": table, **record}
+                       for (name, table), record in sorted(self.stages.items(), key=lambda item: -item[1]["self_s"])],
+            "tables": tables,
+            "latency_buckets_ms": LATENCY_BUCKETS_MS,
+            "profiles": self.profile_files,
+        }
+        for path in self.profile_files:
+            if path.endswith(".prof") and os.path.exists(path):
+                report["top_functions"] = top_functions(path)
+        return report
+
+    def export_json(self, path=None):
+        """
+        Writes the report to output_dir/load-<run_id>.json (or the given path).
+
+        :return: the path written.
+        """
+        path = path or os.path.join(self.output_dir, f"load-{self.run_id}.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        print(f"load telemetry saved to {path}")
+        return path
+
+    def print_summary(self, limit=10):
+        """
+        Prints the slowest stages and the insert throughput of every table.
+        """
+        report = self.to_dict()
+        status = f"load failed after {self.wall_s:.1f}s ({self.error})" if self.error else f"load took {self.wall_s:.1f}s"
+        print(f"\n{status}; slowest stages (self time, excluding nested stages):")
+        for record in report["stages"][:limit]:
+            print(f"  {record['stage']:<22}{str(record['table']):<30}{record['self_s']:10.2f}s self"
+                  f"{record['wall_s']:10.2f}s total  ({record['calls']} calls)")
+        for table_name, table in report["tables"].items():
+            print(f"  {table_name:<30}{table['rows']:>10} rows{table['bytes_sent'] / 1e6:10.1f} MB"
+                  f"{table['execute_s']:10.2f}s execute{table['commit_s']:10.2f}s commit")
+
+
+def current_telemetry():
+    """
+    Returns the telemetry recording the current load, or None.
+    """
+    return _active
+
+
+@contextmanager
+def stage(name, table=None, rows=0):
+    """
+    Times a stage in the active telemetry; does nothing when no load is being recorded.
+    """
+    if _active is None:
+        yield {"rows": rows}
+    else:
+        with _active.stage(name, table, rows) as record:
+            yield record
+
+
+def timed(name, label=None):
+    """
+    Decorator that times every call of a function as a stage of the active telemetry.
+
+    :param name: stage name.
+    :param label: name of the argument used as the stage's table label (e.g. "table_name").
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active is None:
+                return func(*args, **kwargs)
+            table = signature.bind(*args, **kwargs).arguments.get(label) if label else None
+            with _active.stage(name, table):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def session_bytes_received(cursor):
+    """
+    Returns how many bytes the server has received on this session, or None if unavailable.
+    """
+    try:
+        cursor.execute("SHOW SESSION STATUS LIKE 'Bytes_received';")
+        row = cursor.fetchone()
+        return int(row[1]) if row else None
+    except Exception:
+        return None
+
+
+def top_functions(profile_path, limit=20):
+    """
+    Returns the functions with the highest cumulative time in a cProfile dump.
+    """
+    stats = pstats.Stats(profile_path)
+    rows = []
+    for (filename, line, function), (_, calls, total, cumulative, _) in stats.stats.items():
+        rows.append({"function": f"{os.path.basename(filename)}:{line}({function})", "calls": calls,
+                     "total_s": total, "cumulative_s": cumulative})
+    return sorted(rows, key=lambda row: -row["cumulative_s"])[:limit]
+
+
+def compare_runs(path_a, path_b, limit=15):
+    """
+    Prints the stages whose wall time changed most between two exported runs.
+
+    :param path_a: JSON report of the baseline run.
+    :param path_b: JSON report of the new run.
+    """
+    with open(path_a, encoding="utf-8") as f:
+        run_a = json.load(f)
+    with open(path_b, encoding="utf-8") as f:
+        run_b = json.load(f)
+
+    def stage_times(run):
+        # reports written before self times were recorded only have wall times
+        return {(record["stage"], record["table"]): record.get("self_s", record["wall_s"]) for record in run["stages"]}
+
+    times_a, times_b = stage_times(run_a), stage_times(run_b)
+    keys = sorted(set(times_a) | set(times_b), key=lambda key: -abs(times_b.get(key, 0) - times_a.get(key, 0)))
+    print(f"total: {run_a['wall_s']:.1f}s -> {run_b['wall_s']:.1f}s")
+    for name, table in keys[:limit]:
+        before, after = times_a.get((name, table), 0.0), times_b.get((name, table), 0.0)
+        print(f"  {name:<22}{str(table):<30}{before:10.2f}s -> {after:10.2f}s ({after - before:+.2f}s)")
@@ -1,37 +1,71 @@
 """ Includes functions for your DB queries (query NUM). """
 
+from src.columnar_fetch import fetch_columns
+from src.title_index import resolve_title
 
-def query_1(connection, keyword, limit=10):
+
+SEARCH_MODES = {
+    "natural": "IN NATURAL LANGUAGE MODE",
+    "boolean": "IN BOOLEAN MODE",           # +must -must_not word* operators
+    "phrase": "IN BOOLEAN MODE",            # the text is quoted and matched as an exact phrase
+    "expansion": "WITH QUERY EXPANSION",    # a second search with words from the best first-round matches
+}
+
+
+def query_1(connection, keyword, limit=10, columnar=False):
     """
     Searches for movies by overview keyword and ranks results by relevance and popularity.
     """
+    return search_movies(connection, keyword, limit=limit, columnar=columnar)
+
+
+def search_movies(connection, text, mode="natural", limit=10, ngram=False, columnar=False, table="Movies"):
+    """
+    Full-text search over movie overviews, ranked by relevance and popularity.
+    MATCH ... AGAINST filters in WHERE, so the FULLTEXT index only returns matching rows and the cost
+    follows the number of matches rather than the table size.
+
+    :param connection: connection to database.
+    :param text: search text (boolean operators are allowed in "boolean" mode).
+    :param mode: one of SEARCH_MODES.
+    :param limit: maximum number of results.
+    :param ngram: search title and overview through the n-gram index (see create_ngram_index),
+                  which also matches short tokens and partial words.
+    :param columnar: fetch the results straight into typed columns.
+    :param table: table to search (Movies, or a synthetic copy when benchmarking).
+    """
     if not isinstance(limit, int) or limit <= 0 or limit > 10000:  # Validate limit input
         limit = 10
-    query = """
-            SELECT movie_id, title, overview, popularity, relevance
-            FROM (
-                SELECT movie_id, title, overview, popularity, 
-                       MATCH(overview) AGAINST (%s IN NATURAL LANGUAGE MODE) AS relevance
-                FROM Movies
-            ) AS subquery
-            WHERE relevance > 0
+    if mode not in SEARCH_MODES:
+        print(f"Unknown search mode '{mode}', using natural.")
+        mode = "natural"
+    if mode == "phrase":
+        text = '"' + text.replace('"', ' ') + '"'
+
+    columns = "title, overview" if ngram else "overview"
+    match = f"MATCH({columns}) AGAINST (%s {SEARCH_MODES[mode]})"
+    # MySQL evaluates identical MATCH expressions once
+    query = f"""
+            SELECT movie_id, title, overview, popularity, {match} AS relevance
+            FROM {table}
+            WHERE {match}
             ORDER BY relevance DESC, popularity DESC    -- break ties by movie popularity
             LIMIT %s;
             """
-    cursor = connection.cursor()
+    cursor = connection.cursor(raw=columnar)
     try:
-        cursor.execute(query, (keyword, limit))     # execute using prepared statement
-        results = cursor.fetchall()
+        cursor.execute(query, (text, text, limit))     # execute using prepared statement
+        results = fetch_columns(cursor) if columnar else cursor.fetchall()
         column_names = [desc[0] for desc in cursor.description]
     except Exception as e:
-        print(f"Error executing query_1: {e}")
+        print(f"Error executing search_movies: {e}")
         return [], []
     finally:
         cursor.close()
     return results, column_names
 
 
-def query_2(connection, keyword):
+def query_2(connection, keyword, columnar=False):
     """
     Finds actors with the same name (e.g. last or first) and counts how many movies they appeared in.
     Use Case: identifying acting dynasties (e.g., Fonda, Skarsgård)
@@ -44,10 +78,10 @@ def query_2(connection, keyword):
             GROUP BY a.actor_id, a.name
             ORDER BY movie_count DESC;
             """
-    cursor = connection.cursor()
+    cursor = connection.cursor(raw=columnar)
     try:
         cursor.execute(query, (keyword,))
-        results = cursor.fetchall()
+        results = fetch_columns(cursor) if columnar else cursor.fetchall()
         column_names = [desc[0] for desc in cursor.description]
     except Exception as e:
         print(f"Error executing query_2: {e}")
@@ -57,7 +91,7 @@ def query_2(connection, keyword):
     return results, column_names
 
 
-def query_3(connection, genre):
+def query_3(connection, genre, columnar=False):
     """
     Finds the top 5 most profitable movies in a genre and compares them to the genre's average profit.
     """
@@ -74,10 +108,10 @@ def query_3(connection, genre):
             ORDER BY profit DESC
             LIMIT 5;
             """
-    cursor = connection.cursor()
+    cursor = connection.cursor(raw=columnar)
     try:
         cursor.execute(query, (genre,))
-        results = cursor.fetchall()
+        results = fetch_columns(cursor) if columnar else cursor.fetchall()
         column_names = [desc[0] for desc in cursor.description]
     except Exception as e:
         print(f"Error executing query_3: {e}")
@@ -87,7 +121,7 @@ def query_3(connection, genre):
     return results, column_names
 
 
-def query_4(connection, genre):
+def query_4(connection, genre, columnar=False):
     """
     Finds 10 actors who appeared in movies of a given genre with a vote average above the genre's average.
     The actors are ordered by the number of genre's high-rated movies they have appeared in.
@@ -117,10 +151,10 @@ def query_4(connection, genre):
             ORDER BY high_rated_movies DESC
             LIMIT 10;
             """
-    cursor = connection.cursor()
+    cursor = connection.cursor(raw=columnar)
     try:
         cursor.execute(query, (genre, genre))
-        results = cursor.fetchall()
+        results = fetch_columns(cursor) if columnar else cursor.fetchall()
         column_names = [desc[0] for desc in cursor.description]
     except Exception as e:
         print(f"Error executing query_4: {e}")
@@ -130,7 +164,7 @@ def query_4(connection, genre):
     return results, column_names
 
 
-def query_5(connection):
+def query_5(connection, columnar=False):
     """
     Finds the top 5 production companies ranked by total revenue, considering only companies that
     have produced more than 5 movies. Tiebreaker: average revenue per movie.
@@ -148,10 +182,10 @@ def query_5(connection):
             ORDER BY total_revenue DESC, avg_revenue_per_movie DESC
             LIMIT 5;
             """
-    cursor = connection.cursor()
+    cursor = connection.cursor(raw=columnar)
     try:
         cursor.execute(query)
-        results = cursor.fetchall()
+        results = fetch_columns(cursor) if columnar else cursor.fetchall()
         column_names = [desc[0] for desc in cursor.description]
     except Exception as e:
         print(f"Error executing query_5: {e}")
@@ -161,18 +195,21 @@ def query_5(connection):
     return results, column_names
 
 
-def query_6(connection, movie_title, limit=10):
+def query_6(connection, movie_title, limit=10, columnar=False, fuzzy=False):
     """
     Suggests movies related to the given title based on shared keywords, ranked by popularity.
     If several movies with given title exist, chooses the most popular.
     """
     if not isinstance(limit, int) or limit <= 0 or limit > 10000:  # Validate limit input
         limit = 10
-    query = """
+
+    # fuzzy titles (e.g. "hitchhikers guide") are resolved by the trigram index instead of scanning Movies
+    seed_condition = "movie_id = %s" if fuzzy else "title = %s"
+    query = f"""
             WITH MovieID AS (
                 SELECT movie_id
                 FROM Movies
-                WHERE title = %s
+                WHERE {seed_condition}
                 ORDER BY popularity DESC
                 LIMIT 1
             ),
@@ -190,12 +227,16 @@ def query_6(connection, movie_title, limit=10):
             ORDER BY shared_keywords DESC, m.popularity DESC
             LIMIT %s;
             """
-    cursor = connection.cursor()
+    cursor = connection.cursor(raw=columnar)
     try:
-        cursor.execute(query, (movie_title, limit))
-        results = cursor.fetchall()
+        seed = resolve_title(connection, movie_title) if fuzzy else movie_title
+        if seed is None:
+            print(f"No movie title similar to '{movie_title}'.")
+            return [], []
+        cursor.execute(query, (seed, limit))
+        results = fetch_columns(cursor) if columnar else cursor.fetchall()
         column_names = [desc[0] for desc in cursor.description]
-        if not results:
+        if len(results) == 0:
             print(f"No recommendations found for '{movie_title}'.")
     except Exception as e:
         print(f"Error executing query_6: {e}")
@@ -10,14 +10,17 @@ from src.queries_db_script import query_1, query_2, query_3, query_4, query_5, q
 from src.create_db_script import download_and_extract_dataset, create_database_schema, drop_all_tables
 
 
-def execute_query(connection, query_func, *args, max_width=32):
+def execute_query(connection, query_func, *args, max_width=32, max_rows=50, columnar=False, **kwargs):
     """
     Executes the given query function, prints its documentation,
     and displays the first results in a DataFrame, including column names.
     :param connection: connection to database.
     :param query_func: query to execute.
     :param max_width: maximum width of DataFrame columns.
+    :param max_rows: maximum number of rows to display; only these rows are formatted.
+    :param columnar: fetch the results straight into typed columns (see columnar_fetch.py).
     :param args: arguments to pass to query_func.
+    :param kwargs: keyword arguments to pass to query_func (e.g. fuzzy=True for query_6).
     """
     try:
         # Print function docstring (query documentation)
@@ -27,10 +30,16 @@ def execute_query(connection, query_func, *args, max_width=32):
             docstring = "No documentation available."
         print(f"\nQuery Documentation for {query_func.__name__}:\n{docstring}\n")
 
-        results, column_names = query_func(connection, *args)
+        if columnar:
+            results, column_names = query_func(connection, *args, columnar=True, **kwargs)
+        else:
+            results, column_names = query_func(connection, *args, **kwargs)
 
-        if results:
-            df = pd.DataFrame(results, columns=column_names)
+        if len(results) > 0:
+            if isinstance(results, pd.DataFrame):
+                df = results
+            else:
+                df = pd.DataFrame(results, columns=column_names)
 
             # custom formatter for truncating and padding cells
             def custom_formatter(x):
@@ -49,7 +58,10 @@ def execute_query(connection, query_func, *args, max_width=32):
 
             print(''.join(formatted_column_names))
 
-            print(df.to_string(index=False, formatters=formatters, header=False))
+            # format only the rows that are printed
+            print(df.head(max_rows).to_string(index=False, formatters=formatters, header=False))
+            if len(df) > max_rows:
+                print(f"... {len(df) - max_rows} more rows")
         else:
             print(f"\nNo results found for {query_func.__name__}.")
 
@@ -0,0 +1,153 @@
+""" Read/write splitting: writes go to the primary, query_* reads are spread across read replicas. """
+
+import time
+import itertools
+
+import mysql.connector
+
+from config import config as cfg
+
+
+class ReplicaRouter:
+    """
+    Routes schema changes and loader writes to the primary and reads to healthy replicas.
+
+    A replica is used for reads only if its replication threads are running and its lag is at most
+    max_lag_seconds. Reads that must see the router's own writes (read-your-writes) are sent to a replica
+    only once it has applied the primary's GTIDs recorded at the last write; otherwise they fall back to
+    the primary. Without GTIDs, such reads go to the primary until the replicas report zero lag.
+    """
+
+    def __init__(self, primary_config=None, replica_configs=None, max_lag_seconds=5, lag_check_interval=1.0):
+        """
+        :param primary_config: connection settings of the primary (default: cfg.DB_CONFIG).
+        :param replica_configs: list of replica connection settings (default: cfg.REPLICA_DB_CONFIGS).
+        :param max_lag_seconds: replicas lagging more than this are skipped.
+        :param lag_check_interval: seconds a lag measurement is reused before the replica is asked again.
+        """
+        primary_config = primary_config or cfg.DB_CONFIG
+        replica_configs = cfg.REPLICA_DB_CONFIGS if replica_configs is None else replica_configs
+
+        print("connecting to primary...")
+        self.primary = mysql.connector.connect(connection_timeout=60, **primary_config)
+        self.replicas = []
+        for replica_config in replica_configs:
+            print(f"connecting to replica {replica_config['host']}:{replica_config['port']}...")
+            # autocommit ends every read's transaction, so no REPEATABLE READ snapshot outlives a query
+            # (a kept snapshot would hide writes that GTID_SUBSET reports as applied)
+            self.replicas.append(mysql.connector.connect(connection_timeout=60, autocommit=True, **replica_config))
+
+        self.max_lag_seconds = max_lag_seconds
+        self.lag_check_interval = lag_check_interval
+        self._lag_cache = {}                    # replica index -> (checked_at, lag or None)
+        self._round_robin = itertools.cycle(range(len(self.replicas))) if self.replicas else None
+        self._last_write_gtids = None           # primary's executed GTID set after the last write
+        self._pending_write = False             # a write happened that replicas may not have applied yet
+
+    def write_connection(self):
+        """
+        Returns the primary connection, used for create_database_schema and the loader.
+        Call mark_write() after committing so later current reads can be routed safely.
+        """
+        return self.primary
+
+    def mark_write(self):
+        """
+        Records that the primary was written to, for read-your-writes routing.
+        """
+        self._pending_write = True
+        cursor = self.primary.cursor()
+        try:
+            cursor.execute("SELECT @@GLOBAL.gtid_executed;")
+            self._last_write_gtids = cursor.fetchone()[0] or None
+        except mysql.connector.Error:
+            self._last_write_gtids = None
+        finally:
+            cursor.close()
+
+    def replica_lag(self, index):
+        """
+        Returns the replication lag of a replica in seconds, or None if replication is not running.
+
+        :param index: replica index.
+        """
+        checked_at, lag = self._lag_cache.get(index, (0.0, None))
+        if time.monotonic() - checked_at < self.lag_check_interval:
+            return lag
+
+        lag = None
+        cursor = self.replicas[index].cursor(dictionary=True)
+        try:
+            try:
+                cursor.execute("SHOW REPLICA STATUS;")          # MySQL 8.0.22+
+            except mysql.connector.Error:
+                cursor.execute("SHOW SLAVE STATUS;")
+            status = cursor.fetchone()
+            if status:
+                lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+        except mysql.connector.Error as e:
+            print(f"Error checking lag of replica {index}: {e}")
+        finally:
+            cursor.close()
+
+        self._lag_cache[index] = (time.monotonic(), lag)
+        return lag
+
+    def has_applied_writes(self, index):
+        """
+        Checks whether a replica has applied every write recorded by mark_write().
+
+        :param index: replica index.
+        """
+        if not self._pending_write:
+            return True
+        if self._last_write_gtids is None:
+            # no GTIDs to compare: only a fully caught-up replica is known to have the writes
+            self._lag_cache.pop(index, None)
+            return self.replica_lag(index) == 0
+
+        cursor = self.replicas[index].cursor()
+        try:
+            cursor.execute("SELECT GTID_SUBSET(%s, @@GLOBAL.gtid_executed);", (self._last_write_gtids,))
+            return bool(cursor.fetchone()[0])
+        except mysql.connector.Error:
+            return False
+        finally:
+            cursor.close()
+
+    def read_connection(self, require_current=False):
+        """
+        Picks a connection for a read. Replicas are tried round-robin; the primary is the fallback.
+
+        :param require_current: whether the read must observe the router's own writes.
+        :return: a connection.
+        """
+        for _ in range(len(self.replicas)):
+            index = next(self._round_robin)
+            lag = self.replica_lag(index)
+            if lag is None or lag > self.max_lag_seconds:
+                continue
+            if require_current and not self.has_applied_writes(index):
+                continue
+            return self.replicas[index]
+        return self.primary
+
+    def run_query(self, query_func, *args, require_current=False):
+        """
+        Runs a query function on the connection chosen by read_connection().
+
+        :param query_func: query function to run.
+        :param args: arguments to pass to query_func.
+        :param require_current: whether the read must observe the router's own writes.
+        :return: the query function's (results, column_names).
+        """
+        return query_func(self.read_connection(require_current), *args)
+
+    def close(self):
+        """
+        Closes the primary and replica connections.
+        """
+        for connection in [self.primary] + self.replicas:
+            if connection.is_connected():
+                connection.close()
+        print("MySQL connections closed")
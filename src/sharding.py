@@ -0,0 +1,324 @@
+""" Optional sharding layer: hash-partitions movies and their link rows across several databases. """
+
+import zlib
+import heapq
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import mysql.connector
+import pandas as pd
+
+from config import config as cfg
+from src.create_db_script import create_database_schema
+from src.api_data_retrieve import prepare_tables, insert_data
+
+
+# tables partitioned by movie_id; every other table is a small dimension table replicated to all shards
+SHARDED_TABLES = ("Movies", "Movies_Genres", "Movies_Keywords", "Movies_Production_Companies", "Movies_Actors")
+
+
+def shard_of(movie_id, num_shards):
+    """
+    Maps a movie id to its shard. crc32 is stable across processes, unlike Python's hash().
+
+    :param movie_id: id of the movie.
+    :param num_shards: number of shards.
+    :return: shard index in range(num_shards).
+    """
+    return zlib.crc32(str(int(movie_id)).encode()) % num_shards
+
+
+def connect_shards(shard_configs=None):
+    """
+    Opens one connection per shard.
+
+    :param shard_configs: list of connection settings (default: cfg.SHARD_DB_CONFIGS).
+    :return: list of connections, ordered by shard index.
+    """
+    shard_configs = shard_configs or cfg.SHARD_DB_CONFIGS
+    connections = []
+    for shard_config in shard_configs:
+        print(f"connecting to shard {len(connections)} ({shard_config['host']}:{shard_config['port']})...")
+        connections.append(mysql.connector.connect(connection_timeout=60, **shard_config))
+    return connections
+
+
+def create_sharded_schema(connections):
+    """
+    Creates the same schema on every shard.
+
+    :param connections: list of shard connections.
+    """
+    for connection in connections:
+        cursor = connection.cursor()
+        create_database_schema(cursor)
+        cursor.close()
+
+
+def load_data_to_shards(connections):
+    """
+    Loads the dataset into the shards. Movies and their link rows are routed to the shard of their movie_id,
+    so every join on movie_id stays local to one shard; dimension tables are replicated.
+
+    :param connections: list of shard connections.
+    """
+    print(f"loading database schema into {len(connections)} shards... (this might take a while :|)")
+    cursors = [connection.cursor() for connection in connections]
+
+    movies_data = pd.read_csv(cfg.MOVIE_DATA_PATH)
+    credits_data = pd.read_csv(cfg.CREDITS_DATA_PATH)
+
+    for table_name, df in prepare_tables(cursors[0], movies_data, credits_data):
+        if table_name in SHARDED_TABLES:
+            shards = df['movie_id'].map(lambda movie_id: shard_of(movie_id, len(connections)))
+            for shard, (cursor, connection) in enumerate(zip(cursors, connections)):
+                insert_data(cursor, table_name, df[shards == shard].copy(), connection)
+        else:
+            for cursor, connection in zip(cursors, connections):
+                insert_data(cursor, table_name, df.copy(), connection)
+
+    for cursor, connection in zip(cursors, connections):
+        connection.commit()
+        cursor.close()
+    print("All data loading completed!")
+
+
+def scatter(connections, query, params=()):
+    """
+    Runs the same query on every shard in parallel.
+
+    :param connections: list of shard connections.
+    :param query: SQL query to run.
+    :param params: query parameters.
+    :return: list of result row lists, ordered by shard index.
+    """
+    def run(connection):
+        cursor = connection.cursor()
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    with ThreadPoolExecutor(max_workers=len(connections)) as executor:
+        return list(executor.map(run, connections))
+
+
+def sharded_query_1(connections, keyword, limit=10):
+    """
+    Searches for movies by overview keyword and ranks results by relevance and popularity.
+    (scatter-gather: merges the per-shard top results. Relevance uses each shard's own word statistics.)
+    """
+    if not isinstance(limit, int) or limit <= 0 or limit > 10000:  # Validate limit input
+        limit = 10
+    query = """
+            SELECT movie_id, title, overview, popularity,
+                   MATCH(overview) AGAINST (%s IN NATURAL LANGUAGE MODE) AS relevance
+            FROM Movies
+            WHERE MATCH(overview) AGAINST (%s IN NATURAL LANGUAGE MODE)
+            ORDER BY relevance DESC, popularity DESC
+            LIMIT %s;
+            """
+    try:
+        partials = scatter(connections, query, (keyword, keyword, limit))
+    except Exception as e:
+        print(f"Error executing sharded_query_1: {e}")
+        return [], []
+
+    # row: movie_id, title, overview, popularity, relevance
+    results = heapq.nlargest(limit, (row for rows in partials for row in rows), key=lambda row: (row[4], row[3]))
+    return results, ["movie_id", "title", "overview", "popularity", "relevance"]
+
+
+def sharded_query_2(connections, keyword):
+    """
+    Finds actors with the same name (e.g. last or first) and counts how many movies they appeared in.
+    (scatter-gather: sums the per-shard movie counts of every actor.)
+    """
+    query = """
+            SELECT a.actor_id, a.name, COUNT(ma.movie_id) AS movie_count
+            FROM Actors a
+            JOIN Movies_Actors ma ON a.actor_id = ma.actor_id
+            WHERE MATCH(a.name) AGAINST (%s IN NATURAL LANGUAGE MODE)
+            GROUP BY a.actor_id, a.name;
+            """
+    try:
+        partials = scatter(connections, query, (keyword,))
+    except Exception as e:
+        print(f"Error executing sharded_query_2: {e}")
+        return [], []
+
+    counts = defaultdict(int)
+    for rows in partials:
+        for actor_id, name, movie_count in rows:
+            counts[(actor_id, name)] += movie_count
+    results = [(actor_id, name, count) for (actor_id, name), count in counts.items()]
+    results.sort(key=lambda row: row[2], reverse=True)
+    return results, ["actor_id", "name", "movie_count"]
+
+
+def sharded_query_3(connections, genre, limit=5):
+    """
+    Finds the top 5 most profitable movies in a genre and compares them to the genre's average profit.
+    (scatter-gather: merges per-shard top movies, and the average from per-shard profit sums and counts.)
+    """
+    top_query = """
+            SELECT m.movie_id, m.title, (m.revenue - m.budget) AS profit
+            FROM Movies m
+            JOIN Movies_Genres mg ON m.movie_id = mg.movie_id
+            JOIN Genres g ON mg.genre_id = g.genre_id
+            WHERE g.genre_name = %s
+            ORDER BY profit DESC
+            LIMIT %s;
+            """
+    total_query = """
+            SELECT SUM(m.revenue - m.budget), COUNT(*)
+            FROM Movies m
+            JOIN Movies_Genres mg ON m.movie_id = mg.movie_id
+            JOIN Genres g ON mg.genre_id = g.genre_id
+            WHERE g.genre_name = %s;
+            """
+    try:
+        tops = scatter(connections, top_query, (genre, limit))
+        totals = scatter(connections, total_query, (genre,))
+    except Exception as e:
+        print(f"Error executing sharded_query_3: {e}")
+        return [], []
+
+    profit_sum = sum(rows[0][0] or 0 for rows in totals)
+    movie_count = sum(rows[0][1] for rows in totals)
+    if movie_count == 0:
+        return [], []
+    avg_profit = profit_sum / movie_count
+
+    top = heapq.nlargest(limit, (row for rows in tops for row in rows), key=lambda row: row[2])
+    results = [(movie_id, title, profit, avg_profit) for movie_id, title, profit in top]
+    return results, ["movie_id", "title", "profit", "avg_profit"]
+
+
+def sharded_query_4(connections, genre, limit=10):
+    """
+    Finds 10 actors who appeared in movies of a given genre with a vote average above the genre's average.
+    The actors are ordered by the number of genre's high-rated movies they have appeared in.
+    (scatter-gather in two rounds: the global genre average first, then per-shard actor counts.)
+    """
+    avg_query = """
+            SELECT SUM(m.vote_average), COUNT(m.vote_average)
+            FROM Movies m
+            JOIN Movies_Genres mg ON m.movie_id = mg.movie_id
+            JOIN Genres g ON mg.genre_id = g.genre_id
+            WHERE g.genre_name = %s;
+            """
+    # no LIMIT per shard: an actor's movies are spread over shards, so every partial count is needed
+    count_query = """
+            SELECT a.actor_id, a.name, COUNT(m.movie_id) AS high_rated_movies
+            FROM Actors a
+            JOIN Movies_Actors ma ON a.actor_id = ma.actor_id
+            JOIN Movies m ON ma.movie_id = m.movie_id
+            JOIN Movies_Genres mg ON m.movie_id = mg.movie_id
+            JOIN Genres g ON mg.genre_id = g.genre_id
+            WHERE g.genre_name = %s
+            AND m.vote_average > %s
+            GROUP BY a.actor_id, a.name;
+            """
+    try:
+        totals = scatter(connections, avg_query, (genre,))
+        vote_sum = sum(rows[0][0] or 0 for rows in totals)
+        vote_count = sum(rows[0][1] for rows in totals)
+        if vote_count == 0:
+            return [], []
+        partials = scatter(connections, count_query, (genre, vote_sum / vote_count))
+    except Exception as e:
+        print(f"Error executing sharded_query_4: {e}")
+        return [], []
+
+    counts = defaultdict(int)
+    for rows in partials:
+        for actor_id, name, high_rated_movies in rows:
+            counts[(actor_id, name)] += high_rated_movies
+    top = heapq.nlargest(limit, counts.items(), key=lambda item: item[1])
+    results = [(actor_id, name, count) for (actor_id, name), count in top]
+    return results, ["actor_id", "name", "high_rated_movies"]
+
+
+def sharded_query_5(connections, min_movies=5, limit=5):
+    """
+    Finds the top 5 production companies ranked by total revenue, considering only companies that
+    have produced more than 5 movies. Tiebreaker: average revenue per movie.
+    (scatter-gather: HAVING is applied after the per-shard counts and sums are merged.)
+    """
+    query = """
+            SELECT pc.production_company_id, pc.production_company_name,
+                   COUNT(mpc.movie_id), SUM(m.revenue)
+            FROM Production_Companies pc
+            JOIN Movies_Production_Companies mpc ON pc.production_company_id = mpc.production_company_id
+            JOIN Movies m ON m.movie_id = mpc.movie_id
+            GROUP BY pc.production_company_id, pc.production_company_name;
+            """
+    try:
+        partials = scatter(connections, query)
+    except Exception as e:
+        print(f"Error executing sharded_query_5: {e}")
+        return [], []
+
+    totals = defaultdict(lambda: [0, 0])
+    for rows in partials:
+        for company_id, name, movie_count, revenue in rows:
+            totals[(company_id, name)][0] += movie_count
+            totals[(company_id, name)][1] += revenue or 0
+
+    results = [(name, movie_count, revenue, revenue / movie_count)
+               for (_, name), (movie_count, revenue) in totals.items() if movie_count > min_movies]
+    results = heapq.nlargest(limit, results, key=lambda row: (row[2], row[3]))
+    return results, ["production_company_name", "movie_count", "total_revenue", "avg_revenue_per_movie"]
+
+
+def sharded_query_6(connections, movie_title, limit=10):
+    """
+    Suggests movies related to the given title based on shared keywords, ranked by popularity.
+    If several movies with given title exist, chooses the most popular.
+    (scatter-gather: every movie lives on one shard, so merging the per-shard top results is exact.)
+    """
+    seed_query = """
+            SELECT movie_id, popularity
+            FROM Movies
+            WHERE title = %s
+            ORDER BY popularity DESC
+            LIMIT 1;
+            """
+    try:
+        seeds = [rows[0] for rows in scatter(connections, seed_query, (movie_title,)) if rows]
+        if not seeds:
+            print(f"No recommendations found for '{movie_title}'.")
+            return [], []
+        seed_id = max(seeds, key=lambda row: row[1])[0]
+
+        owner = connections[shard_of(seed_id, len(connections))]
+        cursor = owner.cursor()
+        try:
+            cursor.execute("SELECT keyword_id FROM Movies_Keywords WHERE movie_id = %s;", (seed_id,))
+            keyword_ids = [keyword_id for (keyword_id,) in cursor.fetchall()]
+        finally:
+            cursor.close()
+        if not keyword_ids:
+            print(f"No recommendations found for '{movie_title}'.")
+            return [], []
+
+        placeholders = ", ".join(["%s"] * len(keyword_ids))
+        query = f"""
+                SELECT m.movie_id, m.title, m.popularity, COUNT(mk.keyword_id) AS shared_keywords
+                FROM Movies_Keywords mk
+                JOIN Movies m ON mk.movie_id = m.movie_id
+                WHERE mk.keyword_id IN ({placeholders})
+                AND mk.movie_id <> %s
+                GROUP BY m.movie_id, m.title, m.popularity
+                ORDER BY shared_keywords DESC, m.popularity DESC
+                LIMIT %s;
+                """
+        partials = scatter(connections, query, (*keyword_ids, seed_id, limit))
+    except Exception as e:
+        print(f"Error executing sharded_query_6: {e}")
+        return [], []
+
+    results = heapq.nlargest(limit, (row for rows in partials for row in rows), key=lambda row: (row[3], row[2]))
+    return results, ["movie_id", "title", "popularity", "shared_keywords"]
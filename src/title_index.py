@@ -0,0 +1,246 @@
+""" Trigram index over movie titles, used to resolve fuzzy titles (e.g. "hitchhikers guide") to movies. """
+
+import os
+import re
+import math
+import pickle
+import weakref
+import unicodedata
+
+import numpy as np
+
+from config import config as cfg
+
+
+MIN_SIMILARITY = 0.4    # share of the query's trigrams a title must contain to be considered a match
+DENSE_COUNT_RATIO = 16  # candidate postings above 1/16 of all entries are counted densely instead of sorted
+
+_cached_indexes = {}                                # database name -> index checked against that database
+_connection_databases = weakref.WeakKeyDictionary()  # connection -> its database name, asked once
+
+
+def fold_name(text):
+    """
+    Case-folds and strips accents, like MySQL's accent-insensitive collation (Skarsgård -> skarsgard).
+    Only combining marks are dropped, so non-Latin text (ゴジラ) and letters such as ø keep their characters.
+    """
+    decomposed = unicodedata.normalize("NFKD", (text or "").casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def normalize_title(title):
+    """
+    Folds a title (see fold_name) and strips punctuation ("The Hitchhiker's Guide" -> "the hitchhikers guide").
+    """
+    title = re.sub(r"[^\w\s]|_", "", fold_name(title))
+    return " ".join(title.split())
+
+
+def trigrams(title):
+    """
+    Returns the set of trigrams of a normalized title. Every word is padded, so word starts weigh more.
+    """
+    grams = set()
+    for word in title.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TitleTrigramIndex:
+    """
+    Inverted index from trigram to title entries (every movie has an entry for its title and one for its
+    original title), stored as CSR posting arrays. A lookup only touches the postings of the query's
+    trigrams, never the whole table.
+    """
+
+    def __init__(self, rows):
+        """
+        :param rows: rows of (movie_id, title, original_title, popularity).
+        """
+        entry_movies, entry_sizes, postings = [], [], {}
+        self.movie_ids = np.asarray([row[0] for row in rows], dtype=np.int32)
+        self.titles = [row[1] for row in rows]
+        self.popularity = np.asarray([row[3] or 0.0 for row in rows], dtype=np.float32)
+        self.fingerprint = None     # (database, row count, max movie_id) of the data it was built from
+
+        for movie, (_, title, original_title, _) in enumerate(rows):
+            names = {normalize_title(title), normalize_title(original_title)} - {""}
+            for name in names:
+                grams = trigrams(name)
+                entry = len(entry_movies)
+                entry_movies.append(movie)
+                entry_sizes.append(len(grams))
+                for gram in grams:
+                    postings.setdefault(gram, []).append(entry)
+
+        self.entry_movies = np.asarray(entry_movies, dtype=np.int32)
+        self.entry_sizes = np.asarray(entry_sizes, dtype=np.int32)
+        self.gram_ids = {gram: i for i, gram in enumerate(postings)}
+        lengths = np.asarray([len(entries) for entries in postings.values()], dtype=np.int64)
+        self.indptr = np.concatenate(([0], np.cumsum(lengths)))
+        self.indices = np.asarray([entry for entries in postings.values() for entry in entries], dtype=np.int32)
+
+    @classmethod
+    def from_database(cls, cursor):
+        """
+        Builds the index from the Movies table.
+
+        :param cursor: Database cursor for executing queries.
+        :return: a TitleTrigramIndex.
+        """
+        fingerprint = data_fingerprint(cursor)
+        cursor.execute("SELECT movie_id, title, original_title, popularity FROM Movies;")
+        index = cls(cursor.fetchall())
+        index.fingerprint = fingerprint
+        return index
+
+    def save(self, path=None):
+        """
+        Saves the index next to the dataset (default: cfg.TITLE_INDEX_PATH).
+        """
+        with open(path or cfg.TITLE_INDEX_PATH, "wb") as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(path=None):
+        """
+        Loads a saved index (default: cfg.TITLE_INDEX_PATH).
+        """
+        with open(path or cfg.TITLE_INDEX_PATH, "rb") as f:
+            return pickle.load(f)
+
+    def lookup(self, title, limit=5, min_similarity=MIN_SIMILARITY):
+        """
+        Finds the movies whose title or original title is most similar to the given text.
+
+        Titles are ranked by containment (the share of the query's trigrams found in the title), so a
+        partial query such as "hitchhiker" matches the long title it is part of; Jaccard similarity
+        then prefers the closer of two containing titles, and popularity breaks the remaining ties.
+
+        :param title: free text typed by the user.
+        :param limit: maximum number of matches.
+        :param min_similarity: minimum containment of the query's trigrams.
+        :return: list of (movie_id, title, similarity, popularity), best first.
+        """
+        query_grams = trigrams(normalize_title(title))
+        grams = np.asarray([self.gram_ids[gram] for gram in query_grams if gram in self.gram_ids], dtype=np.int64)
+        needed = max(1, math.ceil(min_similarity * len(query_grams)))
+        if len(grams) < needed:
+            return []
+
+        # a title sharing `needed` of the query's trigrams shares at least one of any len(grams) - needed + 1
+        # of them, so candidates come from the postings of the rarest ones only; common trigrams such as
+        # "  t" and " th" are then just probed for those candidates
+        grams = grams[np.argsort(self.indptr[grams + 1] - self.indptr[grams], kind="stable")]
+        selective, common = grams[:len(grams) - needed + 1], grams[len(grams) - needed + 1:]
+        postings = np.concatenate([self.indices[self.indptr[g]:self.indptr[g + 1]] for g in selective])
+        if len(postings) * DENSE_COUNT_RATIO < len(self.entry_movies):
+            entries, shared = np.unique(postings, return_counts=True)
+            for g in common:
+                posting = self.indices[self.indptr[g]:self.indptr[g + 1]]    # sorted by entry
+                found = np.minimum(np.searchsorted(posting, entries), len(posting) - 1)
+                shared += posting[found] == entries
+        else:
+            # even the rarest trigrams are common: one counter per entry is cheaper than sorting candidates
+            counts = np.bincount(postings, minlength=len(self.entry_movies))
+            for g in common:
+                counts[self.indices[self.indptr[g]:self.indptr[g + 1]]] += 1
+            entries = np.flatnonzero(counts >= needed)
+            shared = counts[entries]
+
+        keep = shared >= needed
+        entries, shared = entries[keep], shared[keep]
+        containment = shared / len(query_grams)
+        jaccard = shared / (len(query_grams) + self.entry_sizes[entries] - shared)
+        if len(entries) > 2 * limit:
+            # a movie has at most two entries, so at least `limit` movies score the (2 * limit)-th best
+            # (containment, jaccard) or better; the rest cannot be returned
+            score = shared + jaccard / 2
+            keep = score >= np.partition(score, -2 * limit)[-2 * limit]
+            entries, containment, jaccard = entries[keep], containment[keep], jaccard[keep]
+
+        # a movie scores the best of its title and original title
+        movies = self.entry_movies[entries]
+        order = np.lexsort((-jaccard, -containment, movies))
+        movies, containment, jaccard = movies[order], containment[order], jaccard[order]
+        first = np.concatenate(([True], movies[1:] != movies[:-1]))
+        movies, containment, jaccard = movies[first], containment[first], jaccard[first]
+
+        best = np.lexsort((-self.popularity[movies], -jaccard, -containment))[:limit]
+        return [(int(self.movie_ids[m]), self.titles[m], float(s), float(self.popularity[m]))
+                for m, s in zip(movies[best], containment[best])]
+
+
+def data_fingerprint(cursor):
+    """
+    Identifies the data an index is built from: database name, number of movies and highest movie id.
+
+    :param cursor: Database cursor for executing queries.
+    :return: a (database, row_count, max_movie_id) tuple.
+    """
+    cursor.execute("SELECT DATABASE(), COUNT(*), COALESCE(MAX(movie_id), 0) FROM Movies;")
+    database, row_count, max_movie_id = cursor.fetchone()
+    return database, int(row_count), int(max_movie_id)
+
+
+def build_title_index(cursor, path=None):
+    """
+    Builds the title index from the database and saves it; called at the end of every load, which also
+    replaces the index cached for that database.
+
+    :param cursor: Database cursor for executing queries.
+    :param path: where to save the index (default: cfg.TITLE_INDEX_PATH).
+    :return: the new index.
+    """
+    index = TitleTrigramIndex.from_database(cursor)
+    _cached_indexes[index.fingerprint[0]] = index
+    index.save(path)
+    print("* title trigram index was built.")
+    return index
+
+
+def get_title_index(connection):
+    """
+    Returns the title index of the connection's database, or None if it has none.
+
+    Staleness is checked once per database and process, when the saved index is loaded: it is used only if
+    it was built from the same database with the same rows (not after a reload elsewhere, nor for a shard
+    or scratch copy). Later lookups reuse the cached index, which every load replaces. The index is never
+    built here, so a lookup never scans Movies.
+
+    :param connection: connection to database.
+    :return: a TitleTrigramIndex or None.
+    """
+    database = _connection_databases.get(connection)
+    if database is None or database not in _cached_indexes:
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT DATABASE();")
+            database = cursor.fetchone()[0]
+            _connection_databases[connection] = database
+            if database not in _cached_indexes:
+                index = TitleTrigramIndex.load() if os.path.exists(cfg.TITLE_INDEX_PATH) else None
+                if index is not None and getattr(index, "fingerprint", None) != data_fingerprint(cursor):
+                    index = None
+                _cached_indexes[database] = index
+        finally:
+            cursor.close()
+
+    index = _cached_indexes[database]
+    if index is None:
+        print(f"No up-to-date title index for database '{database}'; build it with build_title_index().")
+    return index
+
+
+def resolve_title(connection, title):
+    """
+    Resolves a fuzzy title to the id of the best matching movie.
+
+    :param connection: connection to database.
+    :param title: free text typed by the user.
+    :return: the movie id, or None if nothing is similar enough.
+    """
+    index = get_title_index(connection)
+    matches = index.lookup(title, limit=1) if index is not None else []
+    return matches[0][0] if matches else None
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# make the repository root importable (src/, config/) when pytest is run from anywhere
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
@@ -0,0 +1,78 @@
+""" Cross-checks the graph engine against hand-computed answers of query_2, query_4 and query_6. """
+
+import numpy as np
+import pytest
+
+from src.graph_engine import GraphEngine, build_csr, gather, fold_name
+
+
+@pytest.fixture
+def engine():
+    # movie_id, title, popularity, vote_average, revenue, budget
+    movies = [
+        (1, "Alpha", 10.0, 7.0, 100, 50),
+        (2, "Beta", 20.0, 5.0, 10, 5),
+        (3, "Gamma", 5.0, 8.0, 1, 1),
+        (4, "ゴジラ", 30.0, 6.0, 0, 0),
+        (5, "Delta", 20.0, 9.0, 0, 0),
+    ]
+    actors = [(10, "Bill Skarsgård"), (11, "Stellan Skarsgård"), (12, "Tom"), (13, "Søren Kierkegaard"),
+              (14, "Robert De Niro"), (15, "Danny De Vito"), (16, "Al Pacino")]
+    genres = [(18, "Drama"), (35, "Comedy")]
+    movies_genres = [(1, 18), (2, 18), (3, 18), (4, 35), (5, 35)]
+    # actor 10 plays two characters in movie 1: both rows count, like the SQL join
+    movies_actors = [(1, 10), (1, 10), (3, 10), (2, 11), (3, 12), (5, 13), (2, 14), (2, 15), (2, 16)]
+    movies_keywords = [(1, 100), (1, 101), (2, 100), (3, 100), (3, 101), (4, 102), (5, 100), (5, 102)]
+    return GraphEngine(movies, actors, genres, movies_genres, movies_actors, movies_keywords)
+
+
+def test_build_csr_and_gather():
+    indptr, indices = build_csr(np.array([2, 0, 2, 1], dtype=np.int32), np.array([5, 6, 7, 8], dtype=np.int32), 4)
+    assert indptr.tolist() == [0, 1, 2, 4, 4]
+    assert indices.tolist() == [6, 8, 5, 7]
+    assert gather(indptr, indices, np.array([2, 0, 3])).tolist() == [5, 7, 6]
+    assert gather(indptr, indices, np.array([3], dtype=np.int64)).tolist() == []
+
+
+def test_fold_name_keeps_non_latin_text():
+    assert fold_name("Skarsgård") == "skarsgard"
+    assert fold_name("ゴジラ") != ""
+    assert fold_name("Søren") == "søren"
+    assert fold_name("Straße") == "strasse"
+
+
+def test_query_2_counts_join_rows(engine):
+    results, _ = engine.query_2("Skarsgard")
+    assert results == [(10, "Bill Skarsgård", 3), (11, "Stellan Skarsgård", 1)]
+
+
+def test_query_2_matches_non_ascii_letters(engine):
+    results, _ = engine.query_2("Søren")
+    assert results == [(13, "Søren Kierkegaard", 1)]
+
+
+def test_query_2_skips_short_words_and_stopwords(engine):
+    # like MATCH ... AGAINST: "de" is a stopword and shorter than innodb_ft_min_token_size, "al" is too short
+    assert engine.query_2("De Niro")[0] == [(14, "Robert De Niro", 1)]
+    assert engine.query_2("Al")[0] == []
+
+
+def test_query_4_genre_is_case_insensitive(engine):
+    # Drama votes 7, 5, 8 -> average 6.67; movies 1 and 3 are above it
+    results, _ = engine.query_4("drama")
+    assert results == [(10, "Bill Skarsgård", 3), (12, "Tom", 1)]
+    assert engine.query_4("Drama")[0] == results
+
+
+def test_query_6_ranks_by_shared_keywords_then_popularity(engine):
+    results, _ = engine.query_6("alpha")
+    assert results[0] == (3, "Gamma", 5.0, 2)
+    # movies 2 and 5 tie on both shared keywords and popularity, so their order is unspecified
+    assert sorted(results[1:]) == [(2, "Beta", 20.0, 1), (5, "Delta", 20.0, 1)]
+
+
+def test_query_6_non_latin_titles(engine):
+    assert engine.query_6("ゴジラ")[0] == [(5, "Delta", 20.0, 1)]
+    # a non-Latin title that is not in the data must not match other non-Latin titles
+    assert engine.query_6("モスラ")[0] == []
+    assert engine.query_6("   ")[0] == []